@@ -1,10 +1,28 @@
-from flask import Flask, request, jsonify, render_template
+import json
+import os
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
 from flask_cors import CORS
-from utils import YouTubeBrailleTranslator
+from utils import YouTubeBrailleTranslator, transcript_store
 
 app = Flask(__name__)
 CORS(app)
 
+# Batch translation limits
+MAX_BATCH_SIZE = int(os.getenv("BRAILLE_MAX_BATCH_SIZE", 100))
+BATCH_WORKERS = int(os.getenv("BRAILLE_BATCH_WORKERS", 8))
+BATCH_ITEM_TIMEOUT = float(os.getenv("BRAILLE_BATCH_ITEM_TIMEOUT", 30))
+# 1 = uncontracted, 2 = contracted
+BRAILLE_GRADES = (1, 2)
+GRADE_ERROR = {"error": "grade must be 1 or 2"}
+
+def parse_grade(value):
+    """Return the Braille grade as an int, or None when it is not 1 or 2"""
+    try:
+        grade = int(value)
+    except (TypeError, ValueError):
+        return None
+    return grade if grade in BRAILLE_GRADES else None
+
 # Route for the homepage
 @app.route('/')
 def index():
@@ -28,8 +46,11 @@ def translate_to_braille():
     if not video_id:
         return jsonify({"error": "Invalid YouTube URL"}), 400
     
-    # Translate transcript to Braille
-    braille_text = translator.translate_transcript_to_braille(video_id)
+    # Translate transcript to Braille (grade=2 enables contractions)
+    grade = parse_grade(request.args.get('grade', 1))
+    if grade is None:
+        return jsonify(GRADE_ERROR), 400
+    braille_text = translator.translate_transcript_to_braille(video_id, grade=grade)
     
     if not braille_text:
         return jsonify({"error": "Braille translation failed"}), 500
@@ -47,5 +68,68 @@ def translate_to_braille():
             "success": True
         })
 
+# Route to stream the Braille translation one transcript segment at a time
+@app.route('/api/youtube-braille/stream', methods=['GET'])
+def stream_braille():
+    video_url = request.args.get('url')
+    if not video_url:
+        return jsonify({"error": "No URL provided"}), 400
+
+    translator = YouTubeBrailleTranslator()
+    video_id = translator.extract_video_id(video_url)
+
+    if not video_id:
+        return jsonify({"error": "Invalid YouTube URL"}), 400
+
+    grade = parse_grade(request.args.get('grade', 1))
+    if grade is None:
+        return jsonify(GRADE_ERROR), 400
+    stream_format = request.args.get('format', default='ndjson')
+    if stream_format not in ('ndjson', 'sse'):
+        return jsonify({"error": "format must be 'ndjson' or 'sse'"}), 400
+
+    # Fetch before streaming so a missing transcript is still a normal error response
+    transcript = translator.get_video_transcript(video_id)
+    if not transcript:
+        return jsonify({"error": "Could not retrieve transcript"}), 404
+
+    def generate():
+        for segment in translator.iter_braille_segments(transcript, grade):
+            line = json.dumps(segment, ensure_ascii=False)
+            yield f"data: {line}\n\n" if stream_format == 'sse' else line + "\n"
+        if stream_format == 'sse':
+            yield "event: end\ndata: {}\n\n"
+
+    mimetype = 'text/event-stream' if stream_format == 'sse' else 'application/x-ndjson'
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# Route to translate a list of videos (e.g. a course playlist) in one call
+@app.route('/api/youtube-braille/batch', methods=['POST'])
+def translate_batch_to_braille():
+    data = request.get_json(silent=True) or {}
+    urls = data.get('urls')
+    if not isinstance(urls, list) or not urls:
+        return jsonify({"error": "A non-empty list of URLs is required"}), 400
+    if len(urls) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"At most {MAX_BATCH_SIZE} URLs per batch"}), 400
+    grade = parse_grade(data.get('grade', 1))
+    if grade is None:
+        return jsonify(GRADE_ERROR), 400
+
+    translator = YouTubeBrailleTranslator()
+    results = translator.translate_batch(
+        urls,
+        grade=grade,
+        max_workers=BATCH_WORKERS,
+        timeout=BATCH_ITEM_TIMEOUT,
+    )
+    return jsonify({"results": results, "success": all(r["success"] for r in results)})
+
+# Route to inspect the shared transcript cache
+@app.route('/api/transcript-cache/stats', methods=['GET'])
+def transcript_cache_stats():
+    return jsonify(transcript_store.stats())
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=3020, debug=True)
\ No newline at end of file
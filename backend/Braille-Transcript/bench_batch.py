@@ -0,0 +1,37 @@
+"""Offline benchmark of batch translation: sequential calls vs the bounded thread pool.
+
+A local fake stands in for YouTube, so no network access is needed.
+Run from this folder:  python bench_batch.py
+"""
+import random
+import time
+from utils import YouTubeBrailleTranslator
+
+SEGMENT = {"text": "in this lecture we cover the basics of linear algebra", "start": 0.0, "duration": 4.2}
+
+
+def fake_fetcher(latency: float = 0.3, segments: int = 600):
+    """Return a fetcher that sleeps like a network round-trip and returns a canned transcript."""
+    def fetch(video_id: str, language: str = "en"):
+        time.sleep(latency * random.uniform(0.5, 1.5))
+        return [SEGMENT] * segments
+    return fetch
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    urls = [f"https://youtube.com/watch?v=video{i:03d}" for i in range(40)]
+    translator = YouTubeBrailleTranslator(fetcher=fake_fetcher())
+
+    start = time.perf_counter()
+    for url in urls:
+        translator.translate_transcript_to_braille(translator.extract_video_id(url))
+    sequential = time.perf_counter() - start
+    print(f"sequential             {sequential:6.2f}s")
+
+    for workers in (2, 4, 8, 16):
+        start = time.perf_counter()
+        results = translator.translate_batch(urls, max_workers=workers)
+        elapsed = time.perf_counter() - start
+        ok = sum(r["success"] for r in results)
+        print(f"batch, {workers:>2} workers      {elapsed:6.2f}s  ({sequential / elapsed:.1f}x, {ok}/{len(urls)} ok)")
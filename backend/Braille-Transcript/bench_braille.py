@@ -0,0 +1,48 @@
+"""Microbenchmark: characters per second of the Braille engine vs the old per-character lookup.
+
+Run from this folder:  python bench_braille.py
+"""
+import time
+from utils import BrailleConverter
+
+# Hand-written captions: sentence case, punctuation and numbers
+MANUAL_CAPTIONS = (
+    "Welcome back to the channel. Today we will look at 3 ways to build a "
+    "Python web app with Flask, and why the request/response cycle matters. "
+    "NASA launched 12 missions in 2023, which is more than you might think! "
+)
+# Auto-generated captions: lowercase words with no punctuation
+AUTO_CAPTIONS = (
+    "so today we are going to talk about how the request response cycle works "
+    "and why it matters when you build something that other people will use "
+)
+
+
+def legacy_to_braille(text: str) -> str:
+    """The original implementation: dict lookup plus lower() for every character."""
+    braille_text = [BrailleConverter.BRAILLE_MAP.get(char.lower(), '⠀') for char in text]
+    return ''.join(braille_text)
+
+
+def chars_per_second(func, text: str, repeat: int = 7) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return len(text) / best
+
+
+if __name__ == "__main__":
+    for label, sample in (("manual captions", MANUAL_CAPTIONS), ("auto captions", AUTO_CAPTIONS)):
+        # Roughly a two hour transcript
+        text = "\n".join([sample] * 5000)
+        results = {
+            "legacy (grade 1, per char)": chars_per_second(legacy_to_braille, text),
+            "engine grade 1": chars_per_second(lambda t: BrailleConverter.to_braille(t, 1), text),
+            "engine grade 2": chars_per_second(lambda t: BrailleConverter.to_braille(t, 2), text),
+        }
+        baseline = results["legacy (grade 1, per char)"]
+        print(f"{label}: {len(text):,} characters")
+        for name, rate in results.items():
+            print(f"  {name:<28} {rate:>14,.0f} chars/s  ({rate / baseline:.1f}x)")
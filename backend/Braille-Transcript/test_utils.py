@@ -0,0 +1,22 @@
+"""Grade 2 (contracted) Braille cases for BrailleConverter.
+
+Run from this folder:  python -m pytest test_utils.py
+"""
+import pytest
+
+from utils import BrailleConverter
+
+
+@pytest.mark.parametrize("text, cells", [
+    ("the", "⠮"),
+    ("stand", "⠌⠯"),
+    ("sing", "⠎⠬"),
+    ("thing", "⠹⠬"),
+    # The ing groupsign is not used at the start of a word
+    ("ingot", "⠊⠝⠛⠕⠞"),
+    ("Ingrid", "⠠⠊⠝⠛⠗⠊⠙"),
+    # Inner apostrophes keep the word whole
+    ("don't", "⠙⠕⠝⠄⠞"),
+])
+def test_grade2_words(text, cells):
+    assert BrailleConverter.to_braille(text, 2) == cells
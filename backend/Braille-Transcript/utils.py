@@ -1,28 +1,219 @@
+import math
+import os
 import re
-from typing import Dict, Optional, List
-from youtube_transcript_api import YouTubeTranscriptApi
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import repeat
+from typing import Callable, Dict, Iterable, Iterator, Optional, List
+
+# Make the shared backend helpers importable
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.transcripts import transcript_store
+
+BLANK_CELL = '⠀'
+CAPITAL_SIGN = '⠠'
+NUMBER_SIGN = '⠼'
+GRADE1_SIGN = '⠰'
+
+
+class _BrailleTable(dict):
+    """Translation table for str.translate that maps unknown characters to a blank cell.
+
+    Misses are stored on first sight so every later lookup of the same
+    character stays inside the C translate loop.
+    """
+
+    def __missing__(self, key):
+        self[key] = BLANK_CELL
+        return BLANK_CELL
+
+
+class _WordCache(dict):
+    """Memo of converted words; a miss converts the word once and stores it."""
+
+    def __init__(self, convert, max_size: int = 65536):
+        super().__init__()
+        self.convert = convert
+        self.max_size = max_size
+
+    def __missing__(self, word):
+        if len(self) >= self.max_size:
+            self.clear()
+        cells = self[word] = self.convert(word)
+        return cells
+
+
+class _ContractionTrie:
+    """Character trie used for longest-match lookup of Grade 2 group signs."""
+
+    def __init__(self, entries: Dict[str, str], exclude: Iterable[str] = ()):
+        self.root: Dict = {}
+        for sequence, cells in entries.items():
+            if sequence in exclude:
+                continue
+            node = self.root
+            for char in sequence:
+                node = node.setdefault(char, {})
+            node[None] = cells
+
+    def longest_match(self, word: str, start: int):
+        """Return (length, cells) of the longest entry starting at `start`, or (0, None)."""
+        node = self.root
+        best_length, best_cells = 0, None
+        for index in range(start, len(word)):
+            node = node.get(word[index])
+            if node is None:
+                break
+            if None in node:
+                best_length, best_cells = index - start + 1, node[None]
+        return best_length, best_cells
+
 
 class BrailleConverter:
     BRAILLE_MAP = {
-        'a': '⠁', 'b': '⠃', 'c': '⠉', 'd': '⠙', 'e': '⠑', 
+        'a': '⠁', 'b': '⠃', 'c': '⠉', 'd': '⠙', 'e': '⠑',
         'f': '⠋', 'g': '⠛', 'h': '⠓', 'i': '⠊', 'j': '⠚',
-        'k': '⠅', 'l': '⠇', 'm': '⠍', 'n': '⠝', 'o': '⠕', 
+        'k': '⠅', 'l': '⠇', 'm': '⠍', 'n': '⠝', 'o': '⠕',
         'p': '⠏', 'q': '⠟', 'r': '⠗', 's': '⠎', 't': '⠞',
-        'u': '⠥', 'v': '⠧', 'w': '⠺', 'x': '⠭', 'y': '⠽', 
+        'u': '⠥', 'v': '⠧', 'w': '⠺', 'x': '⠭', 'y': '⠽',
         'z': '⠵',
         ' ': '⠀', '.': '⠲', ',': '⠂', '!': '⠖',
-        # Add more characters as needed
+        '?': '⠦', ';': '⠆', ':': '⠒', '-': '⠤', "'": '⠄',
+        '"': '⠶', '/': '⠸⠌', '(': '⠐⠣', ')': '⠐⠜',
+    }
+
+    # Digits are written as the letters a-j after a number sign
+    DIGIT_MAP = {
+        '1': '⠁', '2': '⠃', '3': '⠉', '4': '⠙', '5': '⠑',
+        '6': '⠋', '7': '⠛', '8': '⠓', '9': '⠊', '0': '⠚',
+        '.': '⠲', ',': '⠂',
     }
 
+    # Grade 2 (UEB) alphabetic wordsigns and strong wordsigns, used for whole words only
+    WORD_SIGNS = {
+        'but': '⠃', 'can': '⠉', 'do': '⠙', 'every': '⠑', 'from': '⠋',
+        'go': '⠛', 'have': '⠓', 'just': '⠚', 'knowledge': '⠅', 'like': '⠇',
+        'more': '⠍', 'not': '⠝', 'people': '⠏', 'quite': '⠟', 'rather': '⠗',
+        'so': '⠎', 'that': '⠞', 'us': '⠥', 'very': '⠧', 'will': '⠺',
+        'it': '⠭', 'you': '⠽', 'as': '⠵',
+        'child': '⠡', 'shall': '⠩', 'this': '⠹', 'which': '⠱', 'out': '⠳',
+        'still': '⠌',
+        'and': '⠯', 'for': '⠿', 'of': '⠷', 'the': '⠮', 'with': '⠾',
+    }
+
+    # Grade 2 strong contractions and groupsigns, usable anywhere inside a word
+    GROUP_SIGNS = {
+        'and': '⠯', 'for': '⠿', 'of': '⠷', 'the': '⠮', 'with': '⠾',
+        'ch': '⠡', 'gh': '⠣', 'sh': '⠩', 'th': '⠹', 'wh': '⠱',
+        'ed': '⠫', 'er': '⠻', 'ou': '⠳', 'ow': '⠪', 'st': '⠌',
+        'ing': '⠬', 'ar': '⠜',
+    }
+    # Group signs UEB does not use at the start of a word ("ingot" is spelled out)
+    NOT_INITIAL = {'ing'}
+
+    _TABLE = _BrailleTable({ord(char): cells for char, cells in BRAILLE_MAP.items()})
+    _TABLE.update({ord(char.upper()): cells for char, cells in BRAILLE_MAP.items() if char.isalpha()})
+    # Curly apostrophe, as in auto-generated captions
+    _TABLE[ord('\u2019')] = BRAILLE_MAP["'"]
+    # Cells produced by the scanner pass through the final translate unchanged
+    _TABLE.update({code: chr(code) for code in range(0x2800, 0x2900)})
+    _DIGIT_TABLE = str.maketrans(DIGIT_MAP)
+    _TRIE = _ContractionTrie(GROUP_SIGNS)
+    _INITIAL_TRIE = _ContractionTrie(GROUP_SIGNS, exclude=NOT_INITIAL)
+
+    _NUMBER_RE = re.compile(r'\d+(?:[.,]\d+)*')
+    _DIGIT_RE = re.compile(r'\d')
+    # Apostrophes inside a word ("don't", "it's") keep it whole, so no letter is left on its own
+    _WORD_SPLIT_RE = re.compile(r"([A-Za-z]+(?:['\u2019][A-Za-z]+)*)")
+    _CAPS_RE = re.compile(r'[A-Z]')
+
+    @classmethod
+    def to_braille(cls, text: str, grade: int = 1) -> str:
+        """Convert text to Unicode Braille, uncontracted (grade=1) or contracted (grade=2)."""
+        if cls._DIGIT_RE.search(text):
+            text = cls._NUMBER_RE.sub(cls._number_to_braille, text)
+        elif grade != 2 and text.islower():
+            # Fast path for plain lowercase captions: one C-level translate
+            return text.translate(cls._TABLE)
+
+        # Split into [gap, word, gap, word, ..., gap]; words go through the memoised
+        # scanner and the gaps through the translate table
+        words = _GRADE2_WORDS if grade == 2 else _GRADE1_WORDS
+        parts = cls._WORD_SPLIT_RE.split(text)
+        parts[1::2] = map(words.__getitem__, parts[1::2])
+        parts[0::2] = map(str.translate, parts[0::2], repeat(cls._TABLE))
+        return ''.join(parts)
+
     @classmethod
-    def to_braille(cls, text: str) -> str:
-        braille_text = [cls.BRAILLE_MAP.get(char.lower(), '⠀') for char in text]
-        return ''.join(braille_text)
+    def _number_to_braille(cls, match) -> str:
+        cells = NUMBER_SIGN + match.group().translate(cls._DIGIT_TABLE)
+        # A letter a-j straight after a number would otherwise read as another digit
+        following = match.string[match.end():match.end() + 1]
+        if following and following.lower() in 'abcdefghij':
+            cells += GRADE1_SIGN
+        return cells
+
+    @staticmethod
+    def _capital_prefix(word: str) -> Optional[str]:
+        """Capital indicator for a word, or None when its case is mixed."""
+        if word.islower():
+            return ''
+        if word.isupper():
+            return CAPITAL_SIGN * 2 if len(word) > 1 else CAPITAL_SIGN
+        if word[0].isupper() and word[1:].islower():
+            return CAPITAL_SIGN
+        return None
+
+    @classmethod
+    def _uncontracted_word(cls, word: str) -> str:
+        """Grade 1 cells for a single word of ASCII letters and inner apostrophes."""
+        prefix = cls._capital_prefix(word)
+        if prefix is None:
+            # Mixed case such as "iPhone" gets a sign before each capital
+            return cls._CAPS_RE.sub(CAPITAL_SIGN + r'\g<0>', word).translate(cls._TABLE)
+        return prefix + word.translate(cls._TABLE)
+
+    @classmethod
+    def _contract_word(cls, word: str) -> str:
+        """Grade 2 cells for a single word of ASCII letters and inner apostrophes."""
+        prefix = cls._capital_prefix(word)
+        if prefix is None:
+            return cls._uncontracted_word(word)
+
+        lower = word.lower()
+        if lower in cls.WORD_SIGNS:
+            return prefix + cls.WORD_SIGNS[lower]
+        if len(lower) == 1 and lower in 'bcdefghjklmnpqrstuvwxyz':
+            # A lone letter would otherwise read as its wordsign
+            return GRADE1_SIGN + prefix + lower.translate(cls._TABLE)
+
+        # Longest-match scan over the group sign trie
+        cells = []
+        index = 0
+        while index < len(lower):
+            trie = cls._TRIE if index else cls._INITIAL_TRIE
+            length, contraction = trie.longest_match(lower, index)
+            if length:
+                cells.append(contraction)
+                index += length
+            else:
+                cells.append(lower[index].translate(cls._TABLE))
+                index += 1
+        return prefix + ''.join(cells)
+
+
+_GRADE1_WORDS = _WordCache(BrailleConverter._uncontracted_word)
+_GRADE2_WORDS = _WordCache(BrailleConverter._contract_word)
 
 class YouTubeBrailleTranslator:
-    def get_video_transcript(self, video_id: str) -> Optional[List[Dict]]:
+    def __init__(self, fetcher: Optional[Callable[[str, str], List[Dict]]] = None):
+        # fetcher(video_id, language) -> transcript segments; swap in a fake for offline runs
+        self.fetcher = fetcher or transcript_store.get
+
+    def get_video_transcript(self, video_id: str, language: str = "en") -> Optional[List[Dict]]:
         try:
-            return YouTubeTranscriptApi.get_transcript(video_id)
+            return self.fetcher(video_id, language)
         except Exception as e:
             return None
 
@@ -37,14 +228,85 @@ class YouTubeBrailleTranslator:
                 return match.group(1)
         return None
 
-    def translate_transcript_to_braille(self, video_id: str) -> Dict[str, str]:
+    def iter_braille_segments(self, transcript: List[Dict], grade: int = 1) -> Iterator[Dict]:
+        """Yield {start, duration, text, braille} for each transcript segment as it is converted."""
+        for entry in transcript:
+            yield {
+                "start": entry.get('start'),
+                "duration": entry.get('duration'),
+                "text": entry['text'],
+                "braille": BrailleConverter.to_braille(entry['text'], grade),
+            }
+
+    @staticmethod
+    def _transcript_to_braille(transcript: List[Dict], grade: int = 1) -> Dict[str, str]:
+        return {
+            "original_transcript": "\n".join(e['text'] for e in transcript),
+            "braille_transcript": "\n".join(BrailleConverter.to_braille(e['text'], grade) for e in transcript),
+        }
+
+    def translate_transcript_to_braille(self, video_id: str, grade: int = 1) -> Dict[str, str]:
         transcript = self.get_video_transcript(video_id)
         if not transcript:
             return {
                 "original_transcript": "Could not retrieve transcript.",
                 "braille_transcript": "⠉⠕⠥⠇⠙⠀⠝⠕⠞⠀⠗⠑⠞⠗⠊⠑⠧⠑⠀⠞⠗⠁⠝⠎⠉⠗⠊⠏⠞⠲"
             }
-        return {
-            "original_transcript": "\n".join(e['text'] for e in transcript),
-            "braille_transcript": "\n".join(BrailleConverter.to_braille(e['text']) for e in transcript),
-        }
\ No newline at end of file
+        return self._transcript_to_braille(transcript, grade)
+
+    def translate_batch(self, urls: List[str], grade: int = 1, max_workers: int = 8,
+                        timeout: float = 30.0) -> List[Dict]:
+        """Translate several videos, fetching transcripts on a bounded thread pool.
+
+        Each transcript is converted as soon as its fetch completes. Results come
+        back in input order as {url, video_id, success, translation | error}.
+        `timeout` applies to each fetch from the moment a worker picks it up.
+        The whole batch also stops after `timeout` per round of `max_workers`
+        fetches, so hung fetches holding every worker cannot starve the
+        queued ones forever; anything unfinished by then is timed out.
+        """
+        results: List[Dict] = []
+        for url in urls:
+            video_id = self.extract_video_id(url) if isinstance(url, str) else None
+            result = {"url": url, "video_id": video_id, "success": False}
+            if not video_id:
+                result["error"] = "Invalid YouTube URL"
+            results.append(result)
+
+        started: Dict[int, float] = {}
+
+        def fetch(index: int, video_id: str):
+            started[index] = time.monotonic()
+            return self.fetcher(video_id, "en")
+
+        deadline = time.monotonic() + timeout * math.ceil(max(len(urls), 1) / max_workers)
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+        pending = {
+            pool.submit(fetch, index, result["video_id"]): index
+            for index, result in enumerate(results) if result["video_id"]
+        }
+        try:
+            while pending:
+                done, _ = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = results[pending.pop(future)]
+                    try:
+                        transcript = future.result()
+                    except Exception as e:
+                        result["error"] = f"Could not retrieve transcript: {e}"
+                        continue
+                    if not transcript:
+                        result["error"] = "Could not retrieve transcript"
+                        continue
+                    result["translation"] = self._transcript_to_braille(transcript, grade)
+                    result["success"] = True
+
+                # A running thread cannot be killed; stop waiting for it instead
+                now = time.monotonic()
+                for future, index in list(pending.items()):
+                    if now > deadline or (index in started and now - started[index] > timeout):
+                        del pending[future]
+                        results[index]["error"] = f"Timed out after {timeout:g}s"
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        return results
@@ -2,13 +2,21 @@ from flask import Flask, render_template, Response, jsonify
 import cv2
 import mediapipe as mp
 import numpy as np
+import os
+import sys
+
+# Make the shared backend helpers importable
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.resources import ResourceRegistry, register_health_routes
 
 app = Flask(__name__)
 
-# Initialize MediaPipe Hands
+# MediaPipe Hands loads its graph and models when built, so it is built on first use
 mp_hands = mp.solutions.hands
-hands = mp_hands.Hands()
 mp_draw = mp.solutions.drawing_utils
+resources = ResourceRegistry()
+hands_detector = resources.register("hands", mp_hands.Hands)
+register_health_routes(app, resources)
 
 # Global variable to store the detected gesture
 detected_gesture = "None"
@@ -17,6 +25,7 @@ detected_gesture = "None"
 def generate_frames():
     global detected_gesture
     cap = cv2.VideoCapture(0)  # Use webcam
+    hands = hands_detector.get()
     finger_tips = [8, 12, 16, 20]
     thumb_tip = 4
 
@@ -158,4 +167,5 @@ def get_gesture():
     return jsonify({"gesture": detected_gesture})
 
 if __name__ == "__main__":
+    resources.start_warm_up(debug=True)
     app.run(host='0.0.0.0', port=3030,debug=True)
\ No newline at end of file
@@ -0,0 +1,50 @@
+"""Benchmark the sequential and parallel roadmap orchestration with stubbed agents.
+
+The stub agents sleep for each simulated LLM call and tool round-trip, so the
+numbers show orchestration overhead only. No network or API key is used.
+Run from this folder:  python bench_roadmap.py
+"""
+import time
+from orchestration import build_roadmap_prompt, merge_agent_outputs, run_agents_parallel
+
+ANSWERS = {
+    "q1": "Maths and physics", "q2": "8", "q3": "Sometimes", "q4": "9", "q5": "Team",
+    "q6": "Hands-on projects", "q7": "Building things", "q8": "Help people",
+    "q9": "AI, robotics", "q10": "Chess",
+}
+
+
+class StubAgent:
+    """Stands in for a phi Agent: some LLM turns plus some tool calls, all simulated with sleep."""
+
+    def __init__(self, name, llm_turns=2, tool_calls=3, llm_latency=1.0, tool_latency=0.8):
+        self.name = name
+        self.seconds = llm_turns * llm_latency + tool_calls * tool_latency
+
+    def run(self, prompt, **kwargs):
+        time.sleep(self.seconds)
+        return f"{self.name} findings for a prompt of {len(prompt)} characters"
+
+
+def sequential(prompt, agents, merger):
+    # What the team leader does: delegate to each member in turn, then write the answer
+    outputs = {agent.name: agent.run(prompt) for agent in agents}
+    return merge_agent_outputs(prompt, outputs, merger)
+
+
+def parallel(prompt, agents, merger):
+    return merge_agent_outputs(prompt, run_agents_parallel(prompt, agents), merger)
+
+
+if __name__ == "__main__":
+    prompt = build_roadmap_prompt(ANSWERS)
+    agents = [
+        StubAgent("Web Search Agent", llm_turns=2, tool_calls=3),  # DuckDuckGo round-trips
+        StubAgent("Interest-Based Educator Agent", llm_turns=2, tool_calls=2),  # Wikipedia lookups
+    ]
+    merger = StubAgent("Roadmap Editor", llm_turns=1, tool_calls=0)
+
+    for name, orchestrate in (("sequential", sequential), ("parallel", parallel)):
+        start = time.perf_counter()
+        orchestrate(prompt, agents, merger)
+        print(f"{name:<11} {time.perf_counter() - start:6.2f}s")
@@ -0,0 +1,49 @@
+"""Benchmark the Roadmap tool cache against the local fixture corpus.
+
+The fixture backend sleeps to imitate a search round-trip, so the numbers
+show what repeated questionnaire queries cost with and without the cache.
+Run from this folder:  python bench_tool_cache.py
+"""
+import os
+import random
+import time
+from tool_cache import FixtureCorpus, ToolCache
+from common.cache import SQLiteCache
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "tool_corpus.json")
+
+# Queries the agents issue for similar questionnaires, with trivial variations
+QUERIES = [
+    ("duckduckgo_search", "data scientist career path"),
+    ("duckduckgo_search", "Data Scientist career path?"),
+    ("duckduckgo_search", "software engineer career path"),
+    ("duckduckgo_search", "robotics engineer education requirements"),
+    ("duckduckgo_search", "UX designer skills"),
+    ("search_wikipedia", "Data science"),
+    ("search_wikipedia", "Machine learning"),
+    ("search_wikipedia", "robotics"),
+]
+
+
+def run(tool_cache, calls):
+    start = time.perf_counter()
+    for function, query in calls:
+        tool_cache.call(function, None, {"query": query})
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    calls = [random.choice(QUERIES) for _ in range(200)]
+    corpus = FixtureCorpus(FIXTURES, latency=0.25)
+
+    uncached = sum(corpus.latency for _ in calls)
+    tool_cache = ToolCache(cache=SQLiteCache("bench_tools", path=":memory:"), backend=corpus)
+    elapsed = run(tool_cache, calls)
+
+    print(f"{len(calls)} tool calls")
+    print(f"without cache  {uncached:7.2f}s (every call is a round-trip)")
+    print(f"with cache     {elapsed:7.2f}s")
+    for function, stats in tool_cache.stats()["tools"].items():
+        print(f"  {function:<18} hit rate {stats['hit_rate']:.0%}, "
+              f"avg hit {stats['avg_hit_ms']} ms, avg miss {stats['avg_miss_ms']} ms")
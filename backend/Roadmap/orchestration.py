@@ -0,0 +1,74 @@
+"""Prompt building and agent orchestration for the roadmap service.
+
+Kept apart from roadmap.py, which builds the Groq client, the agents, the
+job queue and the Flask app on import, so the benchmarks can use it offline.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+AGENT_TIMEOUT = float(os.getenv("ROADMAP_AGENT_TIMEOUT", 90))
+
+def get_response_text(response) -> str:
+    """Extract text content from RunResponse object or string"""
+    if hasattr(response, 'content'):
+        return str(response.content)
+    return str(response)
+
+def build_roadmap_prompt(answers):
+    """Turn the questionnaire answers (q1-q10) into the roadmap prompt"""
+    # Convert answers to the interest_list format
+    interest_list = {
+        "What subjects do you enjoy the most?": answers.get("q1", ""),
+        "How do you feel about problem-solving tasks or logical challenges (Rate from 1-10)?": answers.get("q2", ""),
+        "Do you enjoy tasks that involve creativity, such as designing or storytelling?": answers.get("q3", ""),
+        "How comfortable are you with working on numbers, statistics, or data analysis? (Rate from 1-10)": answers.get("q4", ""),
+        "Do you prefer working independently or as part of a team?": answers.get("q5", ""),
+        "Would you rather work on hands-on projects (e.g., robotics) or conceptual work (e.g., research)?": answers.get("q6", ""),
+        "Which of these activities excites you the most?": answers.get("q7", ""),
+        "What kind of impact do you want to create through your work?": answers.get("q8", ""),
+        "Which career paths or technologies interest you?": answers.get("q9", ""),
+        "What hobbies or activities do you pursue in your free time?": answers.get("q10", "")
+    }
+
+    return """
+Based on the following interests, suggest 2-3 suitable career options. For each career path, provide:
+1. **Educational Requirements**: List specific degrees, certifications, and courses needed.
+2. **Key Skills**: List 4-5 essential skills required for success.
+3. **Career Progression**: Outline 3-4 levels of career advancement.
+4. **Clear Milestones**: Define specific achievements needed at each stage.
+
+Present the information in a structured format with **bold headings**, bullet points, and numbered lists for better readability.
+
+Interests:
+""" + "\n".join(f"{key}: {value}" for key, value in interest_list.items())
+
+def run_agents_parallel(prompt, agents, timeout=AGENT_TIMEOUT, job=None):
+    """Run every agent on the same prompt at once; returns {agent name: text} for those that finished in time
+
+    With a job context, progress is reported (and cancellation checked) as each agent finishes.
+    """
+    pool = ThreadPoolExecutor(max_workers=len(agents))
+    futures = [(agent, pool.submit(agent.run, prompt)) for agent in agents]
+    deadline = time.monotonic() + timeout
+    outputs = {}
+    try:
+        for index, (agent, future) in enumerate(futures, 1):
+            try:
+                outputs[agent.name] = get_response_text(future.result(timeout=max(0.0, deadline - time.monotonic())))
+            except FutureTimeout:
+                print(f"{agent.name} timed out after {timeout:g}s")
+            except Exception as e:
+                print(f"{agent.name} failed: {e}")
+            if job is not None:
+                job.progress(0.05 + 0.75 * index / len(futures), f"{agent.name} finished")
+    finally:
+        # A timed-out agent keeps its thread until it returns; just stop waiting for it
+        pool.shutdown(wait=False, cancel_futures=True)
+    return outputs
+
+def merge_agent_outputs(prompt, outputs, merger):
+    """Single merge step over the team agents' findings"""
+    findings = "\n\n".join(f"### Findings from {name}\n{text}" for name, text in outputs.items())
+    merge_prompt = f"{prompt}\n\nUse the research below to write the final answer.\n\n{findings}"
+    return get_response_text(merger.run(merge_prompt, markdown=True))
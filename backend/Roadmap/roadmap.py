@@ -5,112 +5,172 @@ from phi.tools.wikipedia import WikipediaTools
 from phi.tools.duckduckgo import DuckDuckGo
 from dotenv import load_dotenv
 import os
-import time
-import os
-from dotenv import load_dotenv
+import sys
+
+# Make the shared backend helpers importable
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.jobs import JOB_SYNC_WAIT, JobQueue, job_response, register_job_routes
+from common.llm import get_groq_client
+from common.resources import ResourceRegistry, register_health_routes
+from orchestration import build_roadmap_prompt, get_response_text, merge_agent_outputs, run_agents_parallel
+from roadmap_cache import RoadmapCache
+from tool_cache import FixtureCorpus, ToolCache
+
 # Load environment variables
 load_dotenv()
 # Initialize Flask app
 app = Flask(__name__)
-os.environ["GROQ_API_KEY"] = os.getenv("GROQ_API_KEY")
-# Initialize Groq LLM
-groq_model = Groq(id="llama-3.3-70b-versatile")
-# Initialize Web Search Agent
-web_search_agent = Agent(
-    name="Web Search Agent",
-    role="Search the web for relevant information.",
-    llm=groq_model,
-    tools=[DuckDuckGo()],
-    instructions=[
-        "Always include credible sources.",
-        "Focus on information that helps guide career decisions.",
-    ],
-    show_tool_calls=True,
-    markdown=True
-)
-
-# Initialize Interest-Based Educator Agent
-interest_agent = Agent(
-    name="Interest-Based Educator Agent",
-    role="Provide career advice and roadmap based on user interests.",
-    llm=groq_model,
-    tools=[WikipediaTools()],
-    instructions=[
-        "Provide a clear and structured text-based roadmap.",
-        "Use **bold headings**, bullet points, and numbered lists for better readability.",
-        "Suggest career fields aligned with the user's interests.",
-        "Include educational requirements, key skills, and career progression.",
-    ],
-    show_tool_calls=True,
-    markdown=True
-)
-
-# Initialize Multi-Agent System
-multi_ai_agent = Agent(
-    team=[web_search_agent, interest_agent],
-    instructions=[
-        "Analyze the input dictionary to identify key interests and align them with career options.",
-        "Provide career suggestions in a structured format with actionable roadmaps.",
-        "Include sources for credibility wherever applicable."
-    ],
-    show_tool_calls=True,
-    markdown=True
-)
-
-def get_response_text(response) -> str:
-    """Extract text content from RunResponse object or string"""
-    if hasattr(response, 'content'):
-        return str(response.content)
-    return str(response)
+if os.getenv("GROQ_API_KEY"):
+    os.environ["GROQ_API_KEY"] = os.getenv("GROQ_API_KEY")
+# Initialize Groq LLM on the shared, rate-limited client
+groq_model = Groq(id="llama-3.3-70b-versatile", client=get_groq_client())
+# Cache search tool results; ROADMAP_TOOL_FIXTURES swaps live search for a local corpus
+tool_fixtures = os.getenv("ROADMAP_TOOL_FIXTURES")
+tool_cache = ToolCache(backend=FixtureCorpus(tool_fixtures) if tool_fixtures else None)
+def build_agents():
+    """Build the team agents, the team leader and the merge editor"""
+    # Initialize Web Search Agent
+    web_search_agent = Agent(
+        name="Web Search Agent",
+        role="Search the web for relevant information.",
+        llm=groq_model,
+        tools=[tool_cache.wrap(DuckDuckGo())],
+        instructions=[
+            "Always include credible sources.",
+            "Focus on information that helps guide career decisions.",
+        ],
+        show_tool_calls=True,
+        markdown=True
+    )
+
+    # Initialize Interest-Based Educator Agent
+    interest_agent = Agent(
+        name="Interest-Based Educator Agent",
+        role="Provide career advice and roadmap based on user interests.",
+        llm=groq_model,
+        tools=[tool_cache.wrap(WikipediaTools())],
+        instructions=[
+            "Provide a clear and structured text-based roadmap.",
+            "Use **bold headings**, bullet points, and numbered lists for better readability.",
+            "Suggest career fields aligned with the user's interests.",
+            "Include educational requirements, key skills, and career progression.",
+        ],
+        show_tool_calls=True,
+        markdown=True
+    )
+
+    # Initialize Multi-Agent System
+    multi_ai_agent = Agent(
+        team=[web_search_agent, interest_agent],
+        instructions=[
+            "Analyze the input dictionary to identify key interests and align them with career options.",
+            "Provide career suggestions in a structured format with actionable roadmaps.",
+            "Include sources for credibility wherever applicable."
+        ],
+        show_tool_calls=True,
+        markdown=True
+    )
+
+    # Editor used by the parallel mode to merge what the team agents found
+    merge_agent = Agent(
+        name="Roadmap Editor",
+        llm=groq_model,
+        instructions=[
+            "Merge the findings of the career research agents into one roadmap.",
+            "Provide career suggestions in a structured format with actionable roadmaps.",
+            "Keep the sources the agents cited for credibility.",
+        ],
+        markdown=True
+    )
+
+    return {
+        "web_search": web_search_agent,
+        "interest": interest_agent,
+        "team": multi_ai_agent,
+        "merge": merge_agent,
+    }
+
+# Agents are built on first use, or by the background warm-up
+resources = ResourceRegistry()
+agents = resources.register("agents", build_agents)
+
+# "parallel" runs the team agents concurrently and merges once; "sequential" uses the team leader
+ROADMAP_MODE = os.getenv("ROADMAP_MODE", "parallel")
+
+def generate_roadmap_text(answers, mode=ROADMAP_MODE, job=None):
+    prompt = build_roadmap_prompt(answers)
+    team = agents.get()
+    if mode == "sequential":
+        # The team leader delegates to each agent in turn
+        return get_response_text(team["team"].run(prompt, markdown=True))
+
+    outputs = run_agents_parallel(prompt, [team["web_search"], team["interest"]], job=job)
+    if not outputs:
+        raise RuntimeError("All roadmap agents failed or timed out")
+    if job is not None:
+        job.progress(0.85, "Merging agent findings")
+    return merge_agent_outputs(prompt, outputs, team["merge"])
+
+# Roadmaps of past questionnaires, reused for identical or near-identical answers
+roadmap_cache = RoadmapCache()
+
+def roadmap_job(payload, job):
+    """Job handler: run the multi-agent pipeline for one questionnaire"""
+    job.progress(0.05, "Running career agents")
+    answers = payload["answers"]
+    roadmap_text = generate_roadmap_text(answers, payload["mode"], job)
+    roadmap_cache.store(answers, roadmap_text)
+    return {"roadmap_text": roadmap_text}
+
+# Roadmap generation runs on background workers instead of the request thread
+jobs = JobQueue("roadmap")
+jobs.register("roadmap", roadmap_job)
+register_job_routes(app, jobs)
+register_health_routes(app, resources)
 
 @app.route("/")
 def home():
     return render_template("roadmap.html")
 
+@app.route("/roadmap-cache/stats")
+def roadmap_cache_stats():
+    return jsonify(roadmap_cache.stats())
+
+@app.route("/tool-cache/stats")
+def tool_cache_stats():
+    return jsonify(tool_cache.stats())
+
 @app.route("/generate-roadmap", methods=["POST"])
 def generate_roadmap():
     try:
         # Get the answers from the request
-        answers = request.json
-
-        # Convert answers to the interest_list format
-        interest_list = {
-            "What subjects do you enjoy the most?": answers.get("q1", ""),
-            "How do you feel about problem-solving tasks or logical challenges (Rate from 1-10)?": answers.get("q2", ""),
-            "Do you enjoy tasks that involve creativity, such as designing or storytelling?": answers.get("q3", ""),
-            "How comfortable are you with working on numbers, statistics, or data analysis? (Rate from 1-10)": answers.get("q4", ""),
-            "Do you prefer working independently or as part of a team?": answers.get("q5", ""),
-            "Would you rather work on hands-on projects (e.g., robotics) or conceptual work (e.g., research)?": answers.get("q6", ""),
-            "Which of these activities excites you the most?": answers.get("q7", ""),
-            "What kind of impact do you want to create through your work?": answers.get("q8", ""),
-            "Which career paths or technologies interest you?": answers.get("q9", ""),
-            "What hobbies or activities do you pursue in your free time?": answers.get("q10", "")
-        }
-
-        # Generate the roadmap (use your existing logic)
-        prompt = """
-Based on the following interests, suggest 2-3 suitable career options. For each career path, provide:
-1. **Educational Requirements**: List specific degrees, certifications, and courses needed.
-2. **Key Skills**: List 4-5 essential skills required for success.
-3. **Career Progression**: Outline 3-4 levels of career advancement.
-4. **Clear Milestones**: Define specific achievements needed at each stage.
-
-Present the information in a structured format with **bold headings**, bullet points, and numbered lists for better readability.
-
-Interests:
-""" + "\n".join(f"{key}: {value}" for key, value in interest_list.items())
-
-        response = multi_ai_agent.run(prompt, markdown=True)
-        roadmap_text = get_response_text(response)
+        answers = {f"q{i}": request.json.get(f"q{i}", "") for i in range(1, 11)}
 
-        # Return the roadmap text
-        return jsonify({
-            "roadmap_text": roadmap_text
+        # A stored roadmap for the same or a very similar questionnaire skips the agent run
+        cached = roadmap_cache.lookup(answers)
+        if cached:
+            return jsonify({"roadmap_text": cached["roadmap_text"], "cache": cached["match"]})
+
+        job_id = jobs.submit("roadmap", {
+            "answers": answers,
+            "mode": request.args.get("mode", ROADMAP_MODE),
         })
 
+        # ?async=1 returns the job id right away; otherwise wait a while for the result
+        wait_seconds = 0 if request.args.get("async") else JOB_SYNC_WAIT
+        job, pending, status = job_response(jobs, job_id, wait_seconds)
+        if pending:
+            return jsonify(pending), status
+        if job["status"] != "done":
+            return jsonify({"error": job["error"] or f"Roadmap job {job['status']}"}), 500
+
+        # Return the roadmap text
+        return jsonify(job["result"])
+
     except Exception as e:
         print(f"Error generating roadmap: {e}")
         return jsonify({"error": str(e)}), 500
 
 if __name__ == "__main__":
+    resources.start_warm_up(debug=True)
     app.run(host='0.0.0.0', port=3019, debug=True)
\ No newline at end of file
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+QUESTION_FIELDS = [f"q{i}" for i in range(1, 11)]
+# Answers a similar questionnaire must share exactly: q9 is the career paths the user asked about
+EXACT_FIELDS = ("q9",)
+
+ROADMAP_CACHE_CAPACITY = int(os.getenv("ROADMAP_CACHE_CAPACITY", 5000))
+# Cosine similarity above which a stored roadmap is reused for a new questionnaire
+ROADMAP_SIMILARITY_THRESHOLD = float(os.getenv("ROADMAP_SIMILARITY_THRESHOLD", 0.92))
+EMBEDDING_DIM = 1024
+
+
+def normalize_answer(value) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", str(value).lower()).split())
+
+
+def normalize_answers(answers: Dict) -> Dict[str, str]:
+    return {field: normalize_answer(answers.get(field, "")) for field in QUESTION_FIELDS}
+
+
+def _features(field: str, text: str):
+    """Words plus character trigrams, so "maths" and "math" still overlap."""
+    for word in text.split():
+        yield f"{field}:{word}"
+        padded = f"#{word}#"
+        for index in range(len(padded) - 2):
+            yield f"{field}~{padded[index:index + 3]}"
+
+
+def embed_answers(answers: Dict[str, str], dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """Hashed bag-of-features embedding of normalised answers, unit length.
+
+    Each question is normalised on its own first, so every field weighs the
+    same no matter how long its answer is.
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for field in QUESTION_FIELDS:
+        field_vector = np.zeros(dim, dtype=np.float32)
+        for feature in _features(field, answers.get(field, "")):
+            digest = zlib.crc32(feature.encode("utf-8"))
+            # The top bit picks the sign, which keeps hash collisions from adding up
+            field_vector[digest % dim] += 1.0 if digest & 0x80000000 else -1.0
+        norm = np.linalg.norm(field_vector)
+        if norm:
+            vector += field_vector / norm
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def exact_fields_id(answers: Dict) -> int:
+    """64-bit id of the raw answers to EXACT_FIELDS.
+
+    Only case and whitespace are normalised: "C++", "C#" and "C" are
+    different careers, although normalize_answer maps them all to "c".
+    """
+    material = "\n".join(" ".join(str(answers.get(field, "")).lower().split()) for field in EXACT_FIELDS)
+    return int.from_bytes(hashlib.sha256(material.encode("utf-8")).digest()[:8], "little", signed=True)
+
+
+class RoadmapCache:
+    """Roadmaps for past questionnaires, matched exactly or by embedding similarity.
+
+    Embeddings live in one preallocated NumPy matrix, so a lookup is a single
+    matrix-vector product. When full, the least recently used entry's row is
+    reused. A similar match must also give the same answers to EXACT_FIELDS,
+    so a different career interest never gets another user's roadmap.
+    """
+
+    def __init__(self, capacity: int = ROADMAP_CACHE_CAPACITY,
+                 threshold: float = ROADMAP_SIMILARITY_THRESHOLD, dim: int = EMBEDDING_DIM):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.dim = dim
+        self.matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self.exact_ids = np.zeros(capacity, dtype=np.int64)  # exact_fields_id of each row
+        self.rows: "OrderedDict[str, int]" = OrderedDict()  # exact key -> matrix row, in LRU order
+        self.roadmaps: Dict[int, str] = {}
+        self.keys: Dict[int, str] = {}
+        self.lock = threading.Lock()
+        self.counters = {"exact_hits": 0, "similar_hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def exact_key(normalized: Dict[str, str], exact_id: int) -> str:
+        return hashlib.sha256(json.dumps([normalized, exact_id], sort_keys=True).encode("utf-8")).hexdigest()
+
+    def lookup(self, answers: Dict) -> Optional[Dict]:
+        """Return {"roadmap_text", "match", "similarity"} for a stored roadmap, or None."""
+        normalized = normalize_answers(answers)
+        exact_id = exact_fields_id(answers)
+        key = self.exact_key(normalized, exact_id)
+        query = embed_answers(normalized, self.dim)
+        with self.lock:
+            row = self.rows.get(key)
+            if row is not None:
+                self.rows.move_to_end(key)
+                self.counters["exact_hits"] += 1
+                return {"roadmap_text": self.roadmaps[row], "match": "exact", "similarity": 1.0}
+
+            if self.rows:
+                used = len(self.rows)
+                # Rows 0..used-1 are always the occupied ones: rows are handed out in order and reused in place
+                scores = np.where(self.exact_ids[:used] == exact_id, self.matrix[:used] @ query, -1.0)
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self.rows.move_to_end(self.keys[best])
+                    self.counters["similar_hits"] += 1
+                    return {"roadmap_text": self.roadmaps[best], "match": "similar", "similarity": float(scores[best])}
+
+            self.counters["misses"] += 1
+            return None
+
+    def store(self, answers: Dict, roadmap_text: str) -> None:
+        normalized = normalize_answers(answers)
+        exact_id = exact_fields_id(answers)
+        key = self.exact_key(normalized, exact_id)
+        embedding = embed_answers(normalized, self.dim)
+        with self.lock:
+            row = self.rows.get(key)
+            if row is None:
+                if len(self.rows) < self.capacity:
+                    row = len(self.rows)
+                else:
+                    _, row = self.rows.popitem(last=False)
+                    self.counters["evictions"] += 1
+                self.rows[key] = row
+            self.rows.move_to_end(key)
+            self.matrix[row] = embedding
+            self.exact_ids[row] = exact_id
+            self.roadmaps[row] = roadmap_text
+            self.keys[row] = key
+
+    def stats(self) -> Dict:
+        with self.lock:
+            stats = dict(self.counters)
+            stats["entries"] = len(self.rows)
+        lookups = stats["exact_hits"] + stats["similar_hits"] + stats["misses"]
+        stats["agent_runs_avoided"] = stats["exact_hits"] + stats["similar_hits"]
+        stats["hit_rate"] = round(stats["agent_runs_avoided"] / lookups, 4) if lookups else 0.0
+        stats["threshold"] = self.threshold
+        return stats
@@ -0,0 +1,81 @@
+"""ToolCache.wrap must not change the tool schema phi sends to the model.
+
+Run from this folder:  python -m pytest test_tool_cache.py
+"""
+import importlib
+
+import pytest
+from phi.tools import Toolkit
+
+from tool_cache import ToolCache
+from common.cache import SQLiteCache  # importable once tool_cache has set up the path
+
+
+class SearchTools(Toolkit):
+    def __init__(self):
+        super().__init__(name="search_tools")
+        self.register(self.search_web)
+
+    def search_web(self, query: str, max_results: int = 5) -> str:
+        """Use this function to search the web for a query.
+
+        Args:
+            query(str): The query to search for.
+            max_results (optional, default=5): The maximum number of results to return.
+
+        Returns:
+            The search results as JSON.
+        """
+        return f"{max_results} results for {query}"
+
+
+def schemas(toolkit):
+    for function in toolkit.functions.values():
+        function.process_entrypoint()
+    return {name: function.to_dict() for name, function in toolkit.functions.items()}
+
+
+@pytest.fixture
+def tool_cache():
+    return ToolCache(cache=SQLiteCache("test_roadmap_tools", path=":memory:"))
+
+
+def test_wrap_keeps_schema(tool_cache):
+    expected = schemas(SearchTools())
+    assert schemas(tool_cache.wrap(SearchTools())) == expected
+    assert expected["search_web"]["description"]
+    assert set(expected["search_web"]["parameters"]["properties"]) == {"query", "max_results"}
+
+
+def test_wrapped_tool_is_cached(tool_cache):
+    function = tool_cache.wrap(SearchTools()).functions["search_web"]
+    assert function.entrypoint(query="Robotics") == "5 results for Robotics"
+    assert function.entrypoint("  ROBOTICS ") == "5 results for Robotics"
+    assert tool_cache.stats()["tools"]["search_web"]["hits"] == 1
+
+
+def test_positional_arguments_are_part_of_the_key(tool_cache):
+    function = tool_cache.wrap(SearchTools()).functions["search_web"]
+    assert function.entrypoint("robotics", 3) == "3 results for robotics"
+    assert function.entrypoint("robotics", 7) == "7 results for robotics"
+    assert function.entrypoint("robotics", max_results=3) == "3 results for robotics"
+    assert tool_cache.stats()["tools"]["search_web"]["hits"] == 1
+
+
+@pytest.mark.parametrize("queries", [("C++", "C#", "C"), ("node.js", "node js")])
+def test_punctuation_is_part_of_the_key(tool_cache, queries):
+    function = tool_cache.wrap(SearchTools()).functions["search_web"]
+    assert [function.entrypoint(query) for query in queries] == [f"5 results for {query}" for query in queries]
+    assert tool_cache.stats()["tools"]["search_web"]["hits"] == 0
+
+
+@pytest.mark.parametrize("module, toolkit", [
+    ("phi.tools.duckduckgo", "DuckDuckGo"),
+    ("phi.tools.wikipedia", "WikipediaTools"),
+])
+def test_wrap_keeps_phi_toolkit_schema(tool_cache, module, toolkit):
+    try:
+        toolkit_class = getattr(importlib.import_module(module), toolkit)
+    except ImportError as e:
+        pytest.skip(str(e))
+    assert schemas(tool_cache.wrap(toolkit_class())) == schemas(toolkit_class())
@@ -0,0 +1,134 @@
+import functools
+import inspect
+import json
+import os
+import re
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Make the shared backend helpers importable
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.cache import SQLiteCache
+
+# Search results go stale slowly for career questions; a week keeps repeats cheap
+TOOL_CACHE_TTL = float(os.getenv("ROADMAP_TOOL_CACHE_TTL", 7 * 24 * 3600))
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("ROADMAP_TOOL_CACHE_MAX_ENTRIES", 5000))
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase and collapse whitespace, so trivial variants share a key.
+
+    Punctuation is kept: "C++", "C#" and "C" are different searches.
+    """
+    return " ".join(str(query).lower().split())
+
+
+class FixtureCorpus:
+    """Offline search backend that answers tool calls from a local JSON corpus.
+
+    The file maps a tool function name to {normalized query: result text}.
+    Unknown queries get the entry with the largest word overlap, so tests and
+    benchmarks do not need an exact fixture for every phrasing.
+    """
+
+    def __init__(self, path: str, latency: float = 0.0):
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+        self.entries = {
+            function: {normalize_query(query): result for query, result in results.items()}
+            for function, results in raw.items()
+        }
+        self.latency = latency
+
+    def call(self, function: str, kwargs: Dict[str, Any]) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        results = self.entries.get(function, {})
+        query = normalize_query(kwargs.get("query", ""))
+        if query in results:
+            return results[query]
+        words = set(re.findall(r"\w+", query))
+        best, best_overlap = None, 0
+        for known, result in results.items():
+            overlap = len(words & set(re.findall(r"\w+", known)))
+            if overlap > best_overlap:
+                best, best_overlap = result, overlap
+        return best if best is not None else "No results found."
+
+
+class ToolCache:
+    """Caching layer for phi toolkits such as DuckDuckGo and WikipediaTools.
+
+    Results are stored in a persistent TTL/LRU cache under a normalised query
+    key. Calls go to the live tool unless a `backend` (anything with
+    `call(function, kwargs)`, e.g. FixtureCorpus) is plugged in.
+    """
+
+    def __init__(self, cache: Optional[SQLiteCache] = None, backend=None):
+        self.backend = backend
+        name = "roadmap_tools" if backend is None else "roadmap_tools_fixture"
+        self.cache = cache or SQLiteCache(name, ttl=TOOL_CACHE_TTL, max_entries=TOOL_CACHE_MAX_ENTRIES)
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _record(self, function: str, hit: bool, seconds: float) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(function, {"hits": 0, "misses": 0, "hit_seconds": 0.0, "miss_seconds": 0.0})
+            if hit:
+                stats["hits"] += 1
+                stats["hit_seconds"] += seconds
+            else:
+                stats["misses"] += 1
+                stats["miss_seconds"] += seconds
+
+    def call(self, function: str, live: Callable[..., Any], kwargs: Dict[str, Any]):
+        """Return the cached result for this tool call, or run it and cache the result."""
+        extra = {name: value for name, value in kwargs.items() if name != "query"}
+        key = f"{function}:{normalize_query(kwargs.get('query', ''))}:{json.dumps(extra, sort_keys=True, default=str)}"
+        fetched = []
+
+        def fetch():
+            fetched.append(True)
+            return self.backend.call(function, kwargs) if self.backend is not None else live(**kwargs)
+
+        start = time.perf_counter()
+        result = self.cache.get_or_compute(key, fetch)
+        self._record(function, hit=not fetched, seconds=time.perf_counter() - start)
+        return result
+
+    def wrap(self, toolkit):
+        """Route every function of a phi Toolkit through the cache; returns the toolkit.
+
+        The wrappers keep the name, docstring and signature of the live
+        functions, so phi builds the same tool schema for the model.
+        """
+        for name, function in toolkit.functions.items():
+            live = function.entrypoint
+
+            signature = inspect.signature(live)
+
+            @functools.wraps(live)
+            def cached(*args, _name=name, _live=live, _signature=signature, **kwargs):
+                # Name positional arguments, so every argument is part of the key
+                kwargs = dict(_signature.bind(*args, **kwargs).arguments)
+                return self.call(_name, _live, kwargs)
+
+            cached.__signature__ = signature
+            function.entrypoint = cached
+        return toolkit
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tools = {}
+            for function, stats in self._stats.items():
+                calls = stats["hits"] + stats["misses"]
+                tools[function] = {
+                    "hits": int(stats["hits"]),
+                    "misses": int(stats["misses"]),
+                    "hit_rate": round(stats["hits"] / calls, 4) if calls else 0.0,
+                    "avg_hit_ms": round(stats["hit_seconds"] / stats["hits"] * 1000, 2) if stats["hits"] else None,
+                    "avg_miss_ms": round(stats["miss_seconds"] / stats["misses"] * 1000, 2) if stats["misses"] else None,
+                }
+        return {"tools": tools, "store": self.cache.stats()}
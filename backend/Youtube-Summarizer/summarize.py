@@ -1,9 +1,20 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
+import hashlib
+import json
 import os
-from youtube_transcript_api import YouTubeTranscriptApi
-from langchain_groq import ChatGroq
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Make the shared backend helpers importable
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.cache import SQLiteCache
+from common.jobs import JOB_SYNC_WAIT, JobCancelled, JobQueue, job_response, register_job_routes
+from common.llm import chat_text, stream_chat_text
+from common.transcripts import transcript_store
 
 # Load environment variables
 load_dotenv()
@@ -25,56 +36,308 @@ Transcript:
 
 Please provide a clear and concise summary in bullet points with headings in **bold**."""
 
-def extract_transcript_details(youtube_video_url):
-    """Extract transcript from YouTube video"""
+# Prompts for hierarchical (map-reduce) summarization of long transcripts
+chunk_prompt = """You are summarizing one part ({start} to {end}) of a longer YouTube video transcript.
+List the key points of this part as short bullet points. Keep names, numbers and definitions. Do not hallucinate.
+
+Transcript part:
+{transcript}"""
+
+reduce_prompt = """You are a Youtube video summarizer. Below are notes taken from consecutive parts of one video, 
+with the time range each part covers. Combine them into one summary of the whole video in an easy-to-understand way, 
+providing key points within 250 words. Focus on the main ideas and important details. Format the summary into clear 
+bullet points for better readability. Use **bold** for headings to highlight key sections. Do not hallucinate.
+
+Notes:
+{notes}
+
+Please provide a clear and concise summary in bullet points with headings in **bold**."""
+
+MODEL_NAME = "llama-3.1-8b-instant"  # Using Llama3 model
+
+# Transcripts longer than this many (estimated) tokens are summarized chunk by chunk
+CHUNK_TOKEN_BUDGET = int(os.getenv("SUMMARY_CHUNK_TOKENS", 3000))
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", 4))
+# "auto" resolves to "hierarchical" or "single" by transcript length
+SUMMARY_MODES = ("auto", "hierarchical", "single")
+
+# Partial summaries survive failures, so a retry only redoes the missing chunks
+chunk_cache = SQLiteCache("summary_chunks", ttl=7 * 24 * 3600, max_entries=5000)
+
+# Finished summaries: fresh for SUMMARY_TTL, then served stale for up to
+# SUMMARY_STALE_TTL more while a background refresh runs
+SUMMARY_TTL = float(os.getenv("SUMMARY_TTL", 24 * 3600))
+SUMMARY_STALE_TTL = float(os.getenv("SUMMARY_STALE_TTL", 7 * 24 * 3600))
+summary_cache = SQLiteCache("summaries", ttl=SUMMARY_TTL, max_entries=int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", 2000)))
+
+# Groq work avoided by summary cache hits
+savings_lock = threading.Lock()
+summary_savings = {"groq_calls_saved": 0, "tokens_saved": 0}
+
+class SummaryError(Exception):
+    """A summary could not be produced; carries the HTTP status to report"""
+
+    def __init__(self, message, status=500):
+        super().__init__(message)
+        self.status = status
+
+def extract_video_id(youtube_video_url):
+    """Get the video id from the supported YouTube URL formats"""
+    if "youtu.be" in youtube_video_url:
+        return youtube_video_url.split("/")[-1].split("?")[0]
+    elif "v=" in youtube_video_url:
+        return youtube_video_url.split("v=")[1].split("&")[0]
+    raise ValueError("Invalid YouTube URL format")
+
+def extract_transcript_segments(youtube_video_url):
+    """Extract the timestamped transcript segments from a YouTube video"""
     try:
-        # Handle different YouTube URL formats
-        if "youtu.be" in youtube_video_url:
-            video_id = youtube_video_url.split("/")[-1]
-        elif "v=" in youtube_video_url:
-            video_id = youtube_video_url.split("v=")[1].split("&")[0]
-        else:
-            raise ValueError("Invalid YouTube URL format")
-            
-        transcript_data = YouTubeTranscriptApi.get_transcript(video_id)
-        transcript = " ".join(item["text"] for item in transcript_data)
-        return transcript.strip(), video_id
+        video_id = extract_video_id(youtube_video_url)
+        return transcript_store.get(video_id), video_id
     except Exception as e:
         print(f"Error extracting transcript: {e}")
         return None, None
 
+def extract_transcript_details(youtube_video_url):
+    """Extract transcript from YouTube video"""
+    transcript_data, video_id = extract_transcript_segments(youtube_video_url)
+    if not transcript_data:
+        return None, None
+    transcript = " ".join(item["text"] for item in transcript_data)
+    return transcript.strip(), video_id
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English)"""
+    return len(text) // 4 + 1
+
+def format_timestamp(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+def chunk_transcript(transcript_data, token_budget=CHUNK_TOKEN_BUDGET):
+    """Split transcript segments into chunks of at most `token_budget` tokens.
+
+    Chunks always end on a segment boundary, so each one maps to a time range.
+    """
+    chunks = []
+    texts, tokens, start = [], 0, None
+    for item in transcript_data:
+        item_tokens = estimate_tokens(item["text"])
+        if texts and tokens + item_tokens > token_budget:
+            chunks.append({"start": start, "end": end, "text": " ".join(texts)})
+            texts, tokens = [], 0
+        if not texts:
+            start = item.get("start", 0.0)
+        texts.append(item["text"])
+        tokens += item_tokens
+        end = item.get("start", 0.0) + item.get("duration", 0.0)
+    if texts:
+        chunks.append({"start": start, "end": end, "text": " ".join(texts)})
+    return chunks
+
+def invoke_model(formatted_prompt):
+    """Run one completion through the shared Groq client and return its text, or None"""
+    summary = chat_text(formatted_prompt, MODEL_NAME, temperature=0.7, max_tokens=4000)
+    if not summary:
+        print("No response content found")
+    return summary
+
 def generate_groq_summary(transcript_text):
-    """Generate summary using Groq API via LangChain"""
+    """Generate summary using the shared Groq client"""
     try:
-        # Initialize the ChatGroq model
-        model = ChatGroq(
-            model_name="llama-3.1-8b-instant",  # Using Llama3 model
-            groq_api_key=groq_api_key,
-            temperature=0.7,
-            max_tokens=4000
-        )
-        
         # Format the prompt with the transcript
         formatted_prompt = prompt.format(transcript=transcript_text)
         
         # Generate the summary
-        response = model.invoke(formatted_prompt)
-        
-        # Extract and return the summary text
-        if response and hasattr(response, 'content'):
-            return response.content.strip()
-        else:
-            print("No response content found")
-            return None
+        return invoke_model(formatted_prompt)
             
     except Exception as e:
         print(f"Error generating summary: {e}")
         return None
 
+def summarize_chunk(chunk):
+    """Summarize one transcript chunk, reusing a cached result when there is one"""
+    formatted_prompt = chunk_prompt.format(
+        start=format_timestamp(chunk["start"]),
+        end=format_timestamp(chunk["end"]),
+        transcript=chunk["text"],
+    )
+    key = hashlib.sha256(f"{MODEL_NAME}\n{formatted_prompt}".encode("utf-8")).hexdigest()
+    return chunk_cache.get_or_compute(key, lambda: invoke_model(formatted_prompt))
+
+def summarize_chunks_to_notes(transcript_data, token_budget=CHUNK_TOKEN_BUDGET, max_workers=SUMMARY_WORKERS, job=None):
+    """Map step: summarize timestamped chunks in parallel and return the joined notes, or None"""
+    chunks = chunk_transcript(transcript_data, token_budget)
+
+    # Chunk summaries run concurrently; failed chunks come back as None
+    def safe_summarize(chunk):
+        # A cancelled job skips its remaining chunks; the checkpoint below raises
+        if job is not None and job.cancelled:
+            return None
+        try:
+            return summarize_chunk(chunk)
+        except Exception as e:
+            print(f"Error summarizing chunk {format_timestamp(chunk['start'])}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        partials = list(pool.map(safe_summarize, chunks))
+    if job is not None:
+        job.progress(0.8, f"Summarized {len(chunks)} chunks")
+
+    missing = sum(1 for partial in partials if not partial)
+    if missing:
+        print(f"{missing} of {len(chunks)} chunks failed; retry to fill them in")
+        return None
+
+    return "\n\n".join(
+        f"[{format_timestamp(chunk['start'])} - {format_timestamp(chunk['end'])}]\n{partial}"
+        for chunk, partial in zip(chunks, partials)
+    )
+
+def generate_hierarchical_summary(transcript_data, token_budget=CHUNK_TOKEN_BUDGET, max_workers=SUMMARY_WORKERS, job=None):
+    """Map-reduce summary: summarize timestamped chunks in parallel, then merge the notes"""
+    try:
+        notes = summarize_chunks_to_notes(transcript_data, token_budget, max_workers, job)
+        if not notes:
+            return None
+
+        # Reduce: merge the partial summaries into the final bullet format
+        return invoke_model(reduce_prompt.format(notes=notes))
+
+    except JobCancelled:
+        raise
+    except Exception as e:
+        print(f"Error generating hierarchical summary: {e}")
+        return None
+
+def summary_cache_key(video_id, strategy):
+    """Hash of everything the summary depends on; editing a prompt template changes the key"""
+    material = "\n".join([video_id, strategy, MODEL_NAME, prompt, chunk_prompt, reduce_prompt])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+def load_transcript(video_id):
+    """Return (segments, joined text) for a video or raise SummaryError"""
+    try:
+        transcript_data = transcript_store.get(video_id)
+    except Exception as e:
+        print(f"Error extracting transcript: {e}")
+        transcript_data = None
+    if not transcript_data:
+        raise SummaryError("Failed to extract transcript", 400)
+    return transcript_data, " ".join(item["text"] for item in transcript_data).strip()
+
+def summary_strategy(mode, transcript_text):
+    """Resolve a request mode to "hierarchical" or "single"; "auto" picks by transcript length"""
+    if mode == "auto":
+        return "hierarchical" if estimate_tokens(transcript_text) > CHUNK_TOKEN_BUDGET else "single"
+    return mode
+
+def build_summary(transcript_data, transcript_text, strategy, job=None):
+    """Summarize a transcript; the hierarchical strategy goes through map-reduce"""
+    if strategy == "hierarchical":
+        summary = generate_hierarchical_summary(transcript_data, job=job)
+        groq_calls = len(chunk_transcript(transcript_data)) + 1
+    else:
+        summary = generate_groq_summary(transcript_text)
+        groq_calls = 1
+
+    if not summary:
+        raise SummaryError("Failed to generate summary", 500)
+    return {
+        "summary": summary,
+        "groq_calls": groq_calls,
+        "tokens": estimate_tokens(prompt) + estimate_tokens(transcript_text) + estimate_tokens(summary),
+    }
+
+def get_summary(video_id, mode="auto", job=None):
+    """Return a cached summary (possibly stale, then refreshed in the background) or build one"""
+    transcript_data, transcript_text = load_transcript(video_id)
+    if job is not None:
+        job.progress(0.1, "Transcript loaded")
+    strategy = summary_strategy(mode, transcript_text)
+    caller = threading.get_ident()
+    built = []
+
+    def compute():
+        # Background refreshes of stale entries do not count against this request, nor stop with its job
+        inline = threading.get_ident() == caller
+        result = build_summary(transcript_data, transcript_text, strategy, job if inline else None)
+        if inline:
+            built.append(result)
+        return result
+
+    result = summary_cache.get_or_compute_stale(summary_cache_key(video_id, strategy), compute, SUMMARY_STALE_TTL)
+    if not built:
+        with savings_lock:
+            summary_savings["groq_calls_saved"] += result.get("groq_calls", 1)
+            summary_savings["tokens_saved"] += result.get("tokens", 0)
+    return result
+
+def stream_summary(video_id, mode="auto"):
+    """Yield summary text as Groq generates it.
+
+    Cached summaries are yielded in one piece. A freshly generated summary is
+    assembled here and stored in the summary cache, so /summarize can serve it.
+    """
+    transcript_data, transcript_text = load_transcript(video_id)
+    strategy = summary_strategy(mode, transcript_text)
+    key = summary_cache_key(video_id, strategy)
+    entry = summary_cache.get_entry(key)
+    if entry is not None and entry[1] <= SUMMARY_TTL + SUMMARY_STALE_TTL:
+        yield get_summary(video_id, strategy)["summary"]
+        return
+
+    if strategy == "hierarchical":
+        # The map step has nothing to show; only the final reduce is streamed
+        notes = summarize_chunks_to_notes(transcript_data)
+        if not notes:
+            raise SummaryError("Failed to generate summary", 500)
+        formatted_prompt = reduce_prompt.format(notes=notes)
+        groq_calls = len(chunk_transcript(transcript_data)) + 1
+    else:
+        formatted_prompt = prompt.format(transcript=transcript_text)
+        groq_calls = 1
+
+    pieces = []
+    for piece in stream_chat_text(formatted_prompt, MODEL_NAME, temperature=0.7, max_tokens=4000):
+        pieces.append(piece)
+        yield piece
+
+    summary = "".join(pieces).strip()
+    if not summary:
+        raise SummaryError("Failed to generate summary", 500)
+    summary_cache.set(key, {
+        "summary": summary,
+        "groq_calls": groq_calls,
+        "tokens": estimate_tokens(prompt) + estimate_tokens(transcript_text) + estimate_tokens(summary),
+    })
+
+def summarize_job(payload, job):
+    """Job handler: summarize one video; expected failures become an error result"""
+    job.progress(0.05, "Summarizing transcript")
+    try:
+        return get_summary(payload["video_id"], payload["mode"], job)
+    except SummaryError as e:
+        return {"error": str(e), "status": e.status}
+
+# Time-to-first-token is the user-facing latency of the streaming endpoint
+stream_metrics_lock = threading.Lock()
+stream_metrics = {"streams": 0, "ttft_ms_total": 0.0, "total_ms_total": 0.0}
+
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
+# Summaries run on background workers instead of the request thread
+jobs = JobQueue("summarize")
+jobs.register("summarize", summarize_job)
+register_job_routes(app, jobs)
+
 @app.route("/")
 def home():
     return render_template("form.html")
@@ -89,21 +352,31 @@ def summarize():
         return jsonify({"error": "YouTube link is required"}), 400
     
     try:
-        # Extract transcript
-        transcript_text, video_id = extract_transcript_details(youtube_link)
-        
-        if not transcript_text or not video_id:
-            return jsonify({"error": "Failed to extract transcript"}), 400
-        
-        # Generate summary
-        summary = generate_groq_summary(transcript_text)
-        
-        if not summary:
-            return jsonify({"error": "Failed to generate summary"}), 500
+        video_id = extract_video_id(youtube_link)
+    except ValueError:
+        return jsonify({"error": "Failed to extract transcript"}), 400
+    mode = data.get("mode", "auto")
+    if mode not in SUMMARY_MODES:
+        return jsonify({"error": f"mode must be one of {', '.join(SUMMARY_MODES)}"}), 400
+
+    try:
+        # Generate summary on the job queue, served from the summary cache when possible
+        job_id = jobs.submit("summarize", {"video_id": video_id, "mode": mode})
+
+        # ?async=1 returns the job id right away; otherwise wait a while for the result
+        wait_seconds = 0 if request.args.get("async") else JOB_SYNC_WAIT
+        job, pending, status = job_response(jobs, job_id, wait_seconds)
+        if pending:
+            return jsonify(pending), status
+        if job["status"] != "done":
+            return jsonify({"error": job["error"] or f"Summary job {job['status']}"}), 500
+        result = job["result"]
+        if "error" in result:
+            return jsonify({"error": result["error"]}), result["status"]
         
         # Return the result as JSON
         return jsonify({
-            "summary": summary,
+            "summary": result["summary"],
             "thumbnail_url": f"http://img.youtube.com/vi/{video_id}/0.jpg"
         })
         
@@ -111,6 +384,77 @@ def summarize():
         print(f"Error in summarize route: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route("/summarize/stream", methods=["POST"])
+def summarize_stream():
+    """Server-Sent Events: thumbnail first, then summary tokens, then the complete text"""
+    data = request.get_json(silent=True) or {}
+    youtube_link = data.get("youtube_link")
+
+    if not youtube_link:
+        return jsonify({"error": "YouTube link is required"}), 400
+
+    try:
+        video_id = extract_video_id(youtube_link)
+    except ValueError:
+        return jsonify({"error": "Failed to extract transcript"}), 400
+    mode = data.get("mode", "auto")
+    if mode not in SUMMARY_MODES:
+        return jsonify({"error": f"mode must be one of {', '.join(SUMMARY_MODES)}"}), 400
+
+    def generate():
+        started = time.perf_counter()
+        yield sse_event("thumbnail", {"thumbnail_url": f"http://img.youtube.com/vi/{video_id}/0.jpg"})
+
+        pieces, ttft = [], None
+        try:
+            for piece in stream_summary(video_id, mode):
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                pieces.append(piece)
+                yield sse_event("token", {"text": piece})
+        except SummaryError as e:
+            yield sse_event("error", {"error": str(e)})
+            return
+        except Exception as e:
+            print(f"Error in summarize stream: {e}")
+            yield sse_event("error", {"error": str(e)})
+            return
+
+        total = time.perf_counter() - started
+        with stream_metrics_lock:
+            stream_metrics["streams"] += 1
+            stream_metrics["ttft_ms_total"] += (ttft or total) * 1000
+            stream_metrics["total_ms_total"] += total * 1000
+        yield sse_event("done", {
+            "summary": "".join(pieces).strip(),
+            "ttft_ms": round((ttft or total) * 1000, 1),
+            "total_ms": round(total * 1000, 1),
+        })
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/summarize/stream/stats")
+def summarize_stream_stats():
+    with stream_metrics_lock:
+        streams = stream_metrics["streams"]
+        return jsonify({
+            "streams": streams,
+            "avg_ttft_ms": round(stream_metrics["ttft_ms_total"] / streams, 1) if streams else None,
+            "avg_total_ms": round(stream_metrics["total_ms_total"] / streams, 1) if streams else None,
+        })
+
+@app.route("/transcript-cache/stats")
+def transcript_cache_stats():
+    return jsonify(transcript_store.stats())
+
+@app.route("/summary-cache/stats")
+def summary_cache_stats():
+    stats = summary_cache.stats()
+    with savings_lock:
+        stats.update(summary_savings)
+    return jsonify(stats)
+
 # New route for YouTube Summarizer form
 @app.route("/youtube-summarizer")
 def youtube_summarizer():
@@ -0,0 +1,53 @@
+"""Measure startup time of each service: import time and import-to-ready time.
+
+Every service is imported in a fresh interpreter from its own folder, the way
+it is started. "import" is how long until the app can serve requests;
+"ready" adds the warm-up of its lazy resources (models, agents, Postgres).
+Services whose dependencies are missing, or whose resources fail to build,
+are reported with the error instead.
+Run from this folder:  python bench_startup.py
+"""
+import json
+import os
+import subprocess
+import sys
+
+SERVICES = [
+    ("scene_discription_2", "predict"),
+    ("Last_SIGN", "app"),
+    ("Roadmap", "roadmap"),
+    ("talk2pdf", "talktopdf2"),
+]
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+import {module} as service
+imported = time.perf_counter()
+service.resources.warm_up()
+ready = time.perf_counter()
+print(json.dumps({{"import": imported - start, "ready": ready - start, "status": service.resources.status()}}))
+"""
+
+
+def measure(folder, module):
+    backend = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([sys.executable, "-c", PROBE.format(module=module)], cwd=os.path.join(backend, folder),
+                            capture_output=True, text=True, env={**os.environ, "RESOURCE_WARMUP": "0"})
+    if result.returncode != 0:
+        return {"error": (result.stderr.strip().splitlines() or ["exited with an error"])[-1]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    print(f"{'service':<32} {'import':>8} {'ready':>8}")
+    for folder, module in SERVICES:
+        timing = measure(folder, module)
+        name = f"{folder}/{module}.py"
+        if "error" in timing:
+            print(f"{name:<32} {'-':>8} {'-':>8}  {timing['error']}")
+            continue
+        failed = [f"{resource}: {state['error']}" for resource, state in timing["status"]["resources"].items()
+                  if state["status"] != "ready"]
+        ready = f"{timing['ready']:7.2f}s" if not failed else "failed"
+        print(f"{name:<32} {timing['import']:7.2f}s {ready:>8}  {'; '.join(failed)}")
@@ -0,0 +1,5 @@
+"""Helpers shared by the backend services.
+
+Each service runs from its own folder, so it puts the backend folder on
+sys.path before importing from here.
+"""
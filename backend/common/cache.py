@@ -0,0 +1,223 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# All on-disk caches live here unless a path is passed explicitly
+CACHE_DIR = os.getenv("ELEV8_CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache"))
+
+
+class SingleFlight:
+    """Run at most one call per key at a time; concurrent callers share its result."""
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, "SingleFlight._Call"] = {}
+
+    def do(self, key: str, func: Callable[[], Any]):
+        """Return (result, shared). `shared` is True when another caller did the work."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+class SQLiteCache:
+    """Persistent key/value cache with TTL, LRU eviction and hit/miss counters.
+
+    Values must be JSON serialisable. The SQLite file can be shared by several
+    processes; the counters are per process.
+    """
+
+    def __init__(self, name: str, ttl: Optional[float] = 24 * 3600, max_entries: Optional[int] = 1000,
+                 max_bytes: Optional[int] = None, path: Optional[str] = None):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.path = path or os.path.join(CACHE_DIR, f"{name}.sqlite3")
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+        self._refreshing = set()
+        self.counters = {"hits": 0, "stale": 0, "misses": 0, "fetches": 0, "coalesced": 0,
+                         "refreshes": 0, "evictions": 0, "expired": 0}
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def get_entry(self, key: str):
+        """Return (value, age_in_seconds) without applying the TTL, or None."""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0]), now - row[1]
+
+    def get(self, key: str, default=None):
+        entry = self.get_entry(key)
+        if entry is not None and (self.ttl is None or entry[1] <= self.ttl):
+            self._count("hits")
+            return entry[0]
+        if entry is not None:
+            self._count("expired")
+            self.delete(key)
+        self._count("misses")
+        return default
+
+    def set(self, key: str, value) -> None:
+        data = json.dumps(value)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), now, now),
+            )
+            evicted = self._evict()
+            self.counters["evictions"] += evicted
+
+    def _evict(self) -> int:
+        """Drop least recently used entries until the size limits hold. Caller holds the lock."""
+        evicted = 0
+        if self.max_entries is not None:
+            count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            if count > self.max_entries:
+                evicted += self._conn.execute(
+                    "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed_at LIMIT ?)",
+                    (count - self.max_entries,),
+                ).rowcount
+        if self.max_bytes is not None:
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at").fetchall():
+                if total <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                total -= size
+                evicted += 1
+        return evicted
+
+    def delete(self, key: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries")
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]):
+        """Return the cached value, or compute and store it.
+
+        Concurrent misses for the same key share a single compute call.
+        Exceptions are not cached.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        def fetch():
+            # Another caller may have filled the entry while we waited for the flight
+            entry = self.get_entry(key)
+            if entry is not None and (self.ttl is None or entry[1] <= self.ttl):
+                return entry[0]
+            self._count("fetches")
+            result = compute()
+            if result is not None:
+                self.set(key, result)
+            return result
+
+        value, shared = self._flight.do(key, fetch)
+        if shared:
+            self._count("coalesced")
+        return value
+
+    def get_or_compute_stale(self, key: str, compute: Callable[[], Any], stale_ttl: float):
+        """Like get_or_compute, but serve entries up to `stale_ttl` past the TTL.
+
+        A stale entry is returned immediately while one background thread
+        recomputes it. Entries older than ttl + stale_ttl are recomputed inline.
+        """
+        entry = self.get_entry(key)
+        if entry is not None:
+            value, age = entry
+            if self.ttl is None or age <= self.ttl:
+                self._count("hits")
+                return value
+            if age <= self.ttl + stale_ttl:
+                self._count("stale")
+                self._refresh_in_background(key, compute)
+                return value
+        return self.get_or_compute(key, compute)
+
+    def _refresh_in_background(self, key: str, compute: Callable[[], Any]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._count("refreshes")
+                value = compute()
+                if value is not None:
+                    self.set(key, value)
+            except Exception as e:
+                print(f"Background refresh of {self.name} entry failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            stats = dict(self.counters)
+        served = stats["hits"] + stats["stale"]
+        lookups = served + stats["misses"]
+        stats.update({
+            "name": self.name,
+            "entries": entries,
+            "bytes": size,
+            "hit_rate": round(served / lookups, 4) if lookups else 0.0,
+        })
+        return stats
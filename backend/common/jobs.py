@@ -0,0 +1,266 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+from common.cache import CACHE_DIR
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+# Finished jobs are kept this long so clients can still fetch their results
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", 24 * 3600))
+# Requests without ?async=1 wait this long for their job before getting a 202
+JOB_SYNC_WAIT = float(os.getenv("JOB_SYNC_WAIT", 60))
+
+PENDING, RUNNING, DONE, FAILED, CANCELLED = "pending", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when its job has been cancelled."""
+
+
+class JobContext:
+    """Handed to job handlers for progress reporting and cooperative cancellation."""
+
+    def __init__(self, queue: "JobQueue", job_id: str):
+        self.queue = queue
+        self.job_id = job_id
+
+    @property
+    def cancelled(self) -> bool:
+        return self.job_id in self.queue._cancel_requested
+
+    def progress(self, fraction: float, message: str = "") -> None:
+        """Record progress between 0 and 1; raises JobCancelled if the job was cancelled."""
+        if self.cancelled:
+            raise JobCancelled()
+        self.queue._update(self.job_id, progress=max(0.0, min(1.0, fraction)), message=message)
+
+
+class JobQueue:
+    """SQLite-backed job queue worked by a pool of threads.
+
+    Jobs survive a restart: anything pending or interrupted mid-run is picked
+    up again when the workers start. Submitting a job identical to one that
+    is still pending or running returns the existing job id.
+    """
+
+    def __init__(self, name: str, workers: int = JOB_WORKERS, path: Optional[str] = None):
+        self.name = name
+        self.workers = workers
+        self.path = path or os.path.join(CACHE_DIR, f"jobs_{name}.sqlite3")
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._handlers: Dict[str, Callable[[Dict, JobContext], Any]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._cancel_requested = set()
+        self._threads = []
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, kind TEXT NOT NULL, dedupe_key TEXT NOT NULL, payload TEXT NOT NULL,"
+                " status TEXT NOT NULL, progress REAL NOT NULL DEFAULT 0, message TEXT NOT NULL DEFAULT '',"
+                " result TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_dedupe ON jobs (dedupe_key, status)")
+
+    def register(self, kind: str, handler: Callable[[Dict, JobContext], Any]) -> None:
+        """Register `handler(payload, context)` for jobs of `kind`. Its return value must be JSON serialisable."""
+        self._handlers[kind] = handler
+
+    def start(self) -> None:
+        """Start the worker threads (idempotent). Interrupted jobs are re-queued."""
+        with self._lock:
+            if self._threads:
+                return
+            with self._conn:
+                self._conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE status = ?",
+                                   (PENDING, time.time(), RUNNING))
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"{self.name}-worker-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, kind: str, payload: Dict) -> str:
+        """Queue a job and return its id, or the id of an identical unfinished job."""
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        self.start()
+        dedupe_key = hashlib.sha256(f"{kind}\n{json.dumps(payload, sort_keys=True)}".encode("utf-8")).hexdigest()
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE dedupe_key = ? AND status IN (?, ?)", (dedupe_key, PENDING, RUNNING)
+                ).fetchone()
+                if row:
+                    return row[0]
+                job_id = uuid.uuid4().hex
+                self._conn.execute(
+                    "INSERT INTO jobs (id, kind, dedupe_key, payload, status, created_at, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, kind, dedupe_key, json.dumps(payload), PENDING, now, now),
+                )
+                self._conn.execute("DELETE FROM jobs WHERE status IN (?, ?, ?) AND updated_at < ?",
+                                   (*FINISHED, now - JOB_RETENTION))
+            self._wakeup.notify()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, kind, status, progress, message, result, error, created_at, updated_at"
+                " FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0], "kind": row[1], "status": row[2], "progress": row[3], "message": row[4],
+            "result": json.loads(row[5]) if row[5] is not None else None, "error": row[6],
+            "created_at": row[7], "updated_at": row[8],
+        }
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        """Cancel a pending job outright; a running job stops at its next progress call.
+
+        A running job that returns without reaching another progress call
+        still ends as cancelled, without a result.
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+                                        (CANCELLED, time.time(), job_id, PENDING))
+            if cursor.rowcount == 0:
+                row = self._conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                if row and row[0] == RUNNING:
+                    self._cancel_requested.add(job_id)
+        return self.get(job_id)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None, interval: float = 0.2) -> Optional[Dict]:
+        """Block until the job finishes or `timeout` passes; returns its latest state."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job["status"] in FINISHED:
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return job
+            time.sleep(interval)
+
+    def _update(self, job_id: str, **fields) -> None:
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def _claim(self):
+        """Mark the oldest pending job as running and return (id, kind, payload). Caller holds the lock."""
+        while True:
+            row = self._conn.execute(
+                "SELECT id, kind, payload FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (PENDING,)
+            ).fetchone()
+            if row is None:
+                return None
+            # Only claim it if it is still pending; another process sharing the file may have taken it since the SELECT
+            with self._conn:
+                claimed = self._conn.execute(
+                    "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+                    (RUNNING, time.time(), row[0], PENDING),
+                ).rowcount
+            if claimed:
+                return row[0], row[1], json.loads(row[2])
+
+    def _work(self) -> None:
+        while True:
+            with self._lock:
+                claimed = self._claim()
+                if claimed is None:
+                    # Poll as well, in case another process queued work in the same file
+                    self._wakeup.wait(timeout=1.0)
+                    continue
+            job_id, kind, payload = claimed
+            handler = self._handlers.get(kind)
+            try:
+                if handler is None:
+                    raise ValueError(f"No handler registered for job kind '{kind}'")
+                result = handler(payload, JobContext(self, job_id))
+                with self._lock:
+                    cancelled = job_id in self._cancel_requested
+                # Cancelled after its last checkpoint: the caller asked not to get the result
+                if cancelled:
+                    raise JobCancelled()
+                self._update(job_id, status=DONE, progress=1.0, result=json.dumps(result))
+            except JobCancelled:
+                self._update(job_id, status=CANCELLED)
+            except Exception as e:
+                print(f"Job {job_id} ({kind}) failed: {e}")
+                self._update(job_id, status=FAILED, error=str(e))
+            finally:
+                with self._lock:
+                    self._cancel_requested.discard(job_id)
+
+
+def register_job_routes(app, queue: JobQueue, prefix: str = "/jobs") -> None:
+    """Add status, cancel and event-stream routes for `queue` to a Flask app."""
+    from flask import Response, jsonify, stream_with_context
+
+    def job_status(job_id):
+        job = queue.get(job_id)
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(job)
+
+    def cancel_job(job_id):
+        job = queue.cancel(job_id)
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(job)
+
+    def job_events(job_id):
+        if queue.get(job_id) is None:
+            return jsonify({"error": "Job not found"}), 404
+
+        def generate():
+            last = None
+            while True:
+                job = queue.get(job_id)
+                if job is None:
+                    # Deleted while streaming, e.g. by the retention clean-up
+                    yield f"event: error\ndata: {json.dumps({'error': 'Job not found'})}\n\n"
+                    return
+                state = (job["status"], job["progress"], job["message"])
+                if state != last:
+                    last = state
+                    yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+                if job["status"] in FINISHED:
+                    return
+                time.sleep(0.5)
+
+        return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    app.add_url_rule(f"{prefix}/<job_id>", "job_status", job_status, methods=["GET"])
+    app.add_url_rule(f"{prefix}/<job_id>/cancel", "cancel_job", cancel_job, methods=["POST"])
+    app.add_url_rule(f"{prefix}/<job_id>/events", "job_events", job_events, methods=["GET"])
+
+
+def job_response(queue: JobQueue, job_id: str, wait_seconds: float, prefix: str = "/jobs"):
+    """Return (job, body, status): the finished job after waiting, or a 202 body pointing at the job routes."""
+    job = queue.wait(job_id, timeout=wait_seconds) if wait_seconds > 0 else queue.get(job_id)
+    if job is not None and job["status"] in FINISHED:
+        return job, None, 200
+    return job, {
+        "job_id": job_id,
+        "status": job["status"] if job else PENDING,
+        "status_url": f"{prefix}/{job_id}",
+        "events_url": f"{prefix}/{job_id}/events",
+        "cancel_url": f"{prefix}/{job_id}/cancel",
+    }, 202
@@ -0,0 +1,224 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+import httpx
+import groq
+from groq import Groq
+
+from common.cache import SingleFlight
+
+# Groq free-tier style limits; override per deployment
+REQUESTS_PER_MINUTE = float(os.getenv("GROQ_REQUESTS_PER_MINUTE", 30))
+TOKENS_PER_MINUTE = float(os.getenv("GROQ_TOKENS_PER_MINUTE", 30000))
+MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", 4))
+MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", 20))
+
+RETRYABLE_ERRORS = (groq.RateLimitError, groq.APIConnectionError, groq.InternalServerError)
+
+
+class TokenBucket:
+    """Thread-safe token bucket. `acquire` blocks until enough budget has refilled."""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Take `amount` from the bucket, waiting as needed. Returns the time spent waiting."""
+        # A request larger than the whole bucket would otherwise never fit
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def charge(self, amount: float) -> None:
+        """Debit usage learned after the fact; the bucket may go negative."""
+        with self.lock:
+            self._refill()
+            self.tokens -= amount
+
+
+def estimate_tokens(messages: List[Dict], max_tokens: Optional[int] = None) -> int:
+    """Rough prompt size (about four characters per token) plus the completion allowance."""
+    chars = 0
+    for message in messages:
+        content = message.get("content", "")
+        if isinstance(content, list):
+            # Multimodal content: count the text parts only
+            content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        chars += len(str(content))
+    return chars // 4 + 1 + (max_tokens or 0)
+
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def count_tokens(text: str) -> int:
+    """Token count of `text` with tiktoken's cl100k_base BPE.
+
+    Groq's models use their own vocabularies, but cl100k is within a few
+    percent for English prose. Without tiktoken (or its vocabulary file)
+    this falls back to about four characters per token.
+    """
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding("cl100k_base")
+                except Exception as e:
+                    print(f"tiktoken unavailable, estimating token counts: {e}")
+                    _encoding = False
+    if _encoding is False:
+        return len(text) // 4 + 1
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+class _GuardedCompletions:
+    """Drop-in for `client.chat.completions` that adds limits, retries and coalescing."""
+
+    def __init__(self, client: "PooledGroq", completions):
+        self._client = client
+        self._completions = completions
+
+    def create(self, **kwargs):
+        if kwargs.get("stream"):
+            # Streams cannot be shared between callers
+            return self._client._call(self._completions.create, kwargs)
+        key = hashlib.sha256(json.dumps(kwargs, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        response, shared = self._client._flight.do(key, lambda: self._client._call(self._completions.create, kwargs))
+        if shared:
+            self._client._count("coalesced")
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._completions, name)
+
+
+class _GuardedChat:
+    def __init__(self, client: "PooledGroq", chat):
+        self.completions = _GuardedCompletions(client, chat.completions)
+
+
+class PooledGroq(Groq):
+    """Groq client shared by every backend service.
+
+    It keeps one keep-alive connection pool, throttles requests and tokens
+    with token buckets, retries 429/5xx/connection errors with jittered
+    exponential backoff and coalesces identical in-flight requests. It is a
+    `groq.Groq`, so it can be passed anywhere a Groq client is expected.
+    """
+
+    def __init__(self, requests_per_minute: float = REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = TOKENS_PER_MINUTE, max_retries: int = MAX_RETRIES, **kwargs):
+        http_client = httpx.Client(
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS,
+                                keepalive_expiry=120),
+            timeout=httpx.Timeout(60.0, connect=10.0),
+        )
+        # Retries are handled here so they also pass through the limiter
+        super().__init__(http_client=http_client, max_retries=0, **kwargs)
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.retries = max_retries
+        self._flight = SingleFlight()
+        self._stats_lock = threading.Lock()
+        self.counters = {"requests": 0, "retries": 0, "errors": 0, "coalesced": 0, "throttled_seconds": 0.0}
+        self.chat = _GuardedChat(self, self.chat)
+
+    def _count(self, name: str, amount: float = 1):
+        with self._stats_lock:
+            self.counters[name] += amount
+
+    def _call(self, create, kwargs: Dict[str, Any]):
+        estimate = estimate_tokens(kwargs.get("messages", []), kwargs.get("max_tokens"))
+        for attempt in range(self.retries + 1):
+            waited = self.request_bucket.acquire(1) + self.token_bucket.acquire(estimate)
+            self._count("requests")
+            if waited:
+                self._count("throttled_seconds", waited)
+            try:
+                response = create(**kwargs)
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.retries:
+                    self._count("errors")
+                    raise
+                self._count("retries")
+                time.sleep(self._backoff(attempt, e))
+                continue
+            except Exception:
+                self._count("errors")
+                raise
+            usage = getattr(response, "usage", None)
+            if usage is not None and getattr(usage, "total_tokens", None):
+                # Settle the estimate against what the API actually counted
+                self.token_bucket.charge(usage.total_tokens - estimate)
+            return response
+
+    @staticmethod
+    def _backoff(attempt: int, error: Exception) -> float:
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return float(retry_after) + random.uniform(0, 0.5)
+            except ValueError:
+                pass
+        # Full jitter: anywhere between 0 and the exponential cap
+        return random.uniform(0, min(30.0, 0.5 * 2 ** attempt))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return dict(self.counters)
+
+
+_client: Optional[PooledGroq] = None
+_client_lock = threading.Lock()
+
+
+def get_groq_client() -> PooledGroq:
+    """Return the process-wide pooled Groq client, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = PooledGroq(api_key=os.getenv("GROQ_API_KEY"))
+        return _client
+
+
+def chat_text(prompt: Union[str, List[Dict]], model: str, **kwargs) -> Optional[str]:
+    """Run one chat completion and return the stripped message text."""
+    messages = [{"role": "user", "content": prompt}] if isinstance(prompt, str) else prompt
+    response = get_groq_client().chat.completions.create(model=model, messages=messages, **kwargs)
+    content = response.choices[0].message.content
+    return content.strip() if content else None
+
+
+def stream_chat_text(prompt: Union[str, List[Dict]], model: str, **kwargs) -> Iterator[str]:
+    """Run one chat completion with streaming and yield the text deltas as they arrive."""
+    messages = [{"role": "user", "content": prompt}] if isinstance(prompt, str) else prompt
+    stream = get_groq_client().chat.completions.create(model=model, messages=messages, stream=True, **kwargs)
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
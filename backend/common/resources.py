@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# Set RESOURCE_WARMUP=0 to build resources only when a request first needs them
+RESOURCE_WARMUP = os.getenv("RESOURCE_WARMUP", "1") != "0"
+
+PENDING, LOADING, READY, FAILED = "pending", "loading", "ready", "failed"
+
+
+class LazyResource:
+    """A heavy object (model, client, connection) built on first use.
+
+    `get` is thread-safe: concurrent first callers wait for one build. A
+    failed build is recorded and retried on the next `get`, so a service
+    can start while a dependency such as Postgres is still down.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.name = name
+        self.factory = factory
+        self.status = PENDING
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self._value = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self.status == READY:
+            return self._value
+        with self._lock:
+            if self.status != READY:
+                self.status = LOADING
+                start = time.perf_counter()
+                try:
+                    self._value = self.factory()
+                except Exception as e:
+                    self.status, self.error = FAILED, str(e)
+                    raise
+                finally:
+                    self.load_seconds = round(time.perf_counter() - start, 3)
+                self.status, self.error = READY, None
+        return self._value
+
+    @property
+    def ready(self) -> bool:
+        return self.status == READY
+
+    def describe(self) -> Dict[str, Any]:
+        return {"status": self.status, "load_seconds": self.load_seconds, "error": self.error}
+
+
+class ResourceRegistry:
+    """The lazily built resources of one service, with warm-up and readiness."""
+
+    def __init__(self):
+        self.resources: Dict[str, LazyResource] = {}
+        self.started_at = time.time()
+        self._warm_up_thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]) -> LazyResource:
+        resource = self.resources[name] = LazyResource(name, factory)
+        return resource
+
+    def get(self, name: str):
+        return self.resources[name].get()
+
+    def warm_up(self, names: Optional[Iterable[str]] = None) -> bool:
+        """Build the named (default: all) resources now; returns True if all of them are ready."""
+        for name in names or list(self.resources):
+            try:
+                self.resources[name].get()
+            except Exception as e:
+                print(f"Warm-up of {name} failed: {e}")
+        return self.ready
+
+    def start_warm_up(self, debug: bool = False) -> Optional[threading.Thread]:
+        """Warm up on a background thread so the server can accept requests meanwhile.
+
+        While a warm-up is running, further calls return the same thread; after
+        a failed one, the next call tries again.
+        """
+        if not RESOURCE_WARMUP:
+            return None
+        if debug and os.environ.get("WERKZEUG_RUN_MAIN") != "true":
+            # This is the reloader's file watcher; only the serving child needs the resources
+            return None
+        with self._lock:
+            if self._warm_up_thread is None or (not self._warm_up_thread.is_alive() and not self.ready):
+                self._warm_up_thread = threading.Thread(target=self.warm_up, name="resource-warm-up", daemon=True)
+                self._warm_up_thread.start()
+            return self._warm_up_thread
+
+    @property
+    def ready(self) -> bool:
+        return all(resource.ready for resource in self.resources.values())
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "uptime_seconds": round(time.time() - self.started_at, 3),
+            "resources": {name: resource.describe() for name, resource in self.resources.items()},
+        }
+
+
+def register_health_routes(app, registry: ResourceRegistry) -> None:
+    """Add /healthz (process is up) and /readyz (every resource is built) to a Flask app.
+
+    A readiness probe also starts the background warm-up, so servers that
+    never run the `__main__` block still get warmed up.
+    """
+    from flask import jsonify
+
+    def healthz():
+        return jsonify({"status": "ok", "uptime_seconds": round(time.time() - registry.started_at, 3)})
+
+    def readyz():
+        if not registry.ready:
+            registry.start_warm_up()
+        status = registry.status()
+        return jsonify(status), 200 if status["ready"] else 503
+
+    app.add_url_rule("/healthz", "healthz", healthz, methods=["GET"])
+    app.add_url_rule("/readyz", "readyz", readyz, methods=["GET"])
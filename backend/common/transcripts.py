@@ -0,0 +1,37 @@
+import os
+from typing import Dict, List, Optional
+
+from common.cache import SQLiteCache
+
+# A transcript rarely changes once published; a day keeps hot videos to one fetch per day
+TRANSCRIPT_TTL = float(os.getenv("TRANSCRIPT_CACHE_TTL", 24 * 3600))
+TRANSCRIPT_MAX_ENTRIES = int(os.getenv("TRANSCRIPT_CACHE_MAX_ENTRIES", 2000))
+
+
+def fetch_youtube_transcript(video_id: str, language: str = "en") -> List[Dict]:
+    """Fetch a transcript from YouTube: a list of {text, start, duration} segments."""
+    from youtube_transcript_api import YouTubeTranscriptApi
+
+    return YouTubeTranscriptApi.get_transcript(video_id, languages=[language])
+
+
+class TranscriptStore:
+    """Transcript cache shared by the Braille-Transcript and Youtube-Summarizer services.
+
+    Entries are keyed by video id and language. Concurrent requests for the
+    same uncached video trigger a single YouTube fetch.
+    """
+
+    def __init__(self, cache: Optional[SQLiteCache] = None, fetcher=fetch_youtube_transcript):
+        self.cache = cache or SQLiteCache("transcripts", ttl=TRANSCRIPT_TTL, max_entries=TRANSCRIPT_MAX_ENTRIES)
+        self.fetcher = fetcher
+
+    def get(self, video_id: str, language: str = "en") -> List[Dict]:
+        """Return the transcript segments, raising the fetcher's error if it cannot be fetched."""
+        return self.cache.get_or_compute(f"{video_id}:{language}", lambda: self.fetcher(video_id, language))
+
+    def stats(self) -> Dict:
+        return self.cache.stats()
+
+
+transcript_store = TranscriptStore()
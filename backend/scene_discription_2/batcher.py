@@ -0,0 +1,92 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+CAPTION_MAX_BATCH = int(os.getenv("CAPTION_MAX_BATCH", 8))
+# How long the first request of a batch waits for others to join it
+CAPTION_MAX_WAIT_MS = float(os.getenv("CAPTION_MAX_WAIT_MS", 20))
+
+
+class MicroBatcher:
+    """Group concurrent requests into batches for one call of `process_batch`.
+
+    `submit` queues an item and returns a Future. A worker thread takes the
+    first waiting item, collects more until `max_batch_size` items are
+    queued or `max_wait_ms` has passed, calls `process_batch(items)` once and
+    hands each caller its own result. If the call fails, every caller in the
+    batch gets the exception.
+    """
+
+    def __init__(self, process_batch: Callable[[List[Any]], List[Any]], max_batch_size: int = CAPTION_MAX_BATCH,
+                 max_wait_ms: float = CAPTION_MAX_WAIT_MS, name: str = "batcher"):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.counters = {"items": 0, "batches": 0, "full_batches": 0, "errors": 0}
+
+    def submit(self, item: Any) -> Future:
+        self._start()
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def map(self, items: List[Any]) -> List[Any]:
+        """Submit every item and wait for all results, in order."""
+        futures = [self.submit(item) for item in items]
+        return [future.result() for future in futures]
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> List:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                # Take whatever is already queued even once the deadline has passed
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = list(self.process_batch(items))
+                # A short result list would leave some callers waiting forever
+                if len(results) != len(batch):
+                    raise ValueError(f"process_batch returned {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                with self._lock:
+                    self.counters["errors"] += 1
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            finally:
+                with self._lock:
+                    self.counters["items"] += len(batch)
+                    self.counters["batches"] += 1
+                    self.counters["full_batches"] += len(batch) == self.max_batch_size
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.counters)
+        stats["avg_batch_size"] = round(stats["items"] / stats["batches"], 2) if stats["batches"] else 0.0
+        stats["max_batch_size"] = self.max_batch_size
+        stats["max_wait_ms"] = self.max_wait * 1000
+        return stats
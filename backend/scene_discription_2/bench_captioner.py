@@ -0,0 +1,91 @@
+"""Benchmark captioning throughput against latency with and without micro-batching, on CPU.
+
+Each client is a thread that captions one image at a time, the way
+concurrent requests call predict_step. For every batching setting the
+table shows images per second and p50/p95 latency per call. If the model
+cannot be downloaded (or with --random-weights), a randomly initialised
+ViT-GPT2 of the same size stands in: captions are noise, but the compute
+per generate call is the same.
+Run from this folder:  python bench_captioner.py [--clients 1,4,8] [--requests 2]
+"""
+import argparse
+import glob
+import threading
+import time
+
+import numpy as np
+
+import predict
+from batcher import MicroBatcher
+
+SETTINGS = [("no batching", 1, 0), ("batch 4, 10 ms", 4, 10), ("batch 8, 20 ms", 8, 20)]
+
+
+class TokenIdDecoder:
+    """Tokenizer stand-in for the random model: captions are the token ids."""
+
+    def batch_decode(self, output_ids, skip_special_tokens=True):
+        return [" ".join(str(int(token)) for token in ids) for ids in output_ids]
+
+
+def random_captioner():
+    import torch
+    from transformers import GPT2Config, GPT2LMHeadModel, ViTConfig, ViTImageProcessor, ViTModel
+    from transformers import VisionEncoderDecoderModel
+
+    decoder = GPT2LMHeadModel(GPT2Config(add_cross_attention=True, is_decoder=True))
+    model = VisionEncoderDecoderModel(encoder=ViTModel(ViTConfig()), decoder=decoder)
+    # GPT-2's end-of-text token, as in the real checkpoint
+    model.config.decoder_start_token_id = model.config.pad_token_id = model.config.eos_token_id = 50256
+    model.generation_config.decoder_start_token_id = model.generation_config.pad_token_id = 50256
+    model.eval()
+    return model, ViTImageProcessor(), TokenIdDecoder(), torch.device("cpu")
+
+
+def run_clients(images, clients, requests):
+    latencies, lock = [], threading.Lock()
+
+    def client(index):
+        for request in range(requests):
+            image = images[(index * requests + request) % len(images)]
+            start = time.perf_counter()
+            predict.predict_step([image])
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(latencies) / (time.perf_counter() - start), np.percentile(latencies, [50, 95])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", default="1,4,8")
+    parser.add_argument("--requests", type=int, default=2, help="captions per client")
+    parser.add_argument("--random-weights", action="store_true")
+    args = parser.parse_args()
+
+    if args.random_weights:
+        predict.captioner.factory = random_captioner
+    try:
+        predict.captioner.get()
+    except OSError as e:
+        print(f"Could not load {predict.MODEL_NAME} ({str(e).splitlines()[0]}); using random weights")
+        predict.captioner.factory = random_captioner
+        predict.captioner.get()
+
+    images = [predict.load_image(path) for path in sorted(glob.glob("uploads/*"))]
+    # One untimed call, so lazy initialisation inside torch is not measured
+    predict.caption_batch(images[:1])
+
+    print(f"{'setting':<16} {'clients':>7} {'images/s':>9} {'p50':>8} {'p95':>8} {'avg batch':>10}")
+    for label, max_batch_size, max_wait_ms in SETTINGS:
+        for clients in (int(value) for value in args.clients.split(",")):
+            predict.caption_batcher = MicroBatcher(predict.caption_batch, max_batch_size, max_wait_ms)
+            throughput, (p50, p95) = run_clients(images, clients, args.requests)
+            batch = predict.caption_batcher.stats()["avg_batch_size"]
+            print(f"{label:<16} {clients:>7} {throughput:9.2f} {p50:7.2f}s {p95:7.2f}s {batch:>10}")
@@ -0,0 +1,106 @@
+"""Benchmark /upload image preparation: per-image CPU time and peak RSS for phone photos.
+
+"legacy" is the old path: save the upload to disk, reopen it, fully decode,
+squash to 224x224 and re-encode. "in-memory" decodes from the request bytes
+in JPEG draft mode, applies the EXIF orientation and keeps the aspect ratio.
+Each path runs in its own interpreter so peak RSS is not shared; peak RSS is
+read from /proc, so it needs Linux.
+Run from this folder:  python bench_images.py [photo.jpg ...] [--images 20]
+"""
+import argparse
+import base64
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from images import decode_image, image_to_base64
+
+# Typical phone cameras: 12 MP (4:3) and 48 MP binned to 12 MP, plus an older 8 MP
+PHONE_SIZES = [(4032, 3024), (3024, 4032), (3264, 2448)]
+
+
+def write_sample_photos(folder, count):
+    """Smooth gradients with noise, saved as quality 92 JPEGs with an EXIF rotation like a phone's."""
+    rng = np.random.default_rng(0)
+    paths = []
+    for index in range(len(PHONE_SIZES)):
+        width, height = PHONE_SIZES[index]
+        y, x = np.mgrid[0:height, 0:width]
+        pixels = np.stack([x * 255 // width, y * 255 // height, (x + y) * 127 // (width + height)], axis=-1)
+        pixels = np.clip(pixels + rng.normal(0, 12, pixels.shape), 0, 255).astype(np.uint8)
+        image = Image.fromarray(pixels)
+        exif = image.getexif()
+        exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise
+        path = os.path.join(folder, f"photo_{index}.jpg")
+        image.save(path, quality=92, exif=exif)
+        paths.append(path)
+    return [paths[index % len(paths)] for index in range(count)]
+
+
+def legacy_prepare(data, folder):
+    path = os.path.join(folder, "upload.jpg")
+    with open(path, "wb") as f:
+        f.write(data)
+    image = Image.open(path).resize((224, 224))
+    buffered = BytesIO()
+    image.save(buffered, format="JPEG")
+    return base64.b64encode(buffered.getvalue()).decode("utf-8")
+
+
+def in_memory_prepare(data, folder):
+    return image_to_base64(decode_image(BytesIO(data)))
+
+
+def memory_status(field):
+    """A field of /proc/self/status, in MB."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def run(path_name, photos):
+    """Child process: prepare every photo and report CPU time and the RSS high-water mark."""
+    prepare = legacy_prepare if path_name == "legacy" else in_memory_prepare
+    uploads = [open(photo, "rb").read() for photo in photos]
+    folder = tempfile.mkdtemp()
+    # Reset the RSS high-water mark to the current RSS, so the peak only counts preparing the images
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    baseline = memory_status("VmRSS")
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for data in uploads:
+        prepare(data, folder)
+    cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+    peak = memory_status("VmHWM") - baseline
+    print(json.dumps({"cpu_ms": cpu * 1000 / len(uploads), "wall_ms": wall * 1000 / len(uploads),
+                      "peak_rss_mb": peak}))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("photos", nargs="*")
+    parser.add_argument("--images", type=int, default=20)
+    parser.add_argument("--run", choices=["legacy", "in-memory"])
+    args = parser.parse_args()
+
+    if args.run:
+        run(args.run, args.photos)
+        sys.exit()
+
+    photos = args.photos or write_sample_photos(tempfile.mkdtemp(), args.images)
+    print(f"{len(photos)} photos, {sum(os.path.getsize(p) for p in photos) / len(photos) / 1e6:.1f} MB on average")
+    print(f"{'path':<10} {'cpu/image':>10} {'wall/image':>11} {'peak RSS':>10}")
+    for path_name in ("legacy", "in-memory"):
+        output = subprocess.run([sys.executable, __file__, "--run", path_name, *photos],
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{path_name:<10} {result['cpu_ms']:8.1f}ms {result['wall_ms']:9.1f}ms {result['peak_rss_mb']:7.1f} MB")
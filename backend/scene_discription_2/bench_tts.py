@@ -0,0 +1,76 @@
+"""Benchmark time-to-first-audio of sentence-streamed TTS against one gTTS call for the whole text.
+
+gTTS sends one request per ~100 characters, one after another, so by
+default a stand-in with that shape replaces the network: `--latency`
+seconds per request. Pass --real to call Google instead. Every run uses an
+empty cache folder, so nothing is served from disk.
+Run from this folder:  python bench_tts.py [--real] [--latency 0.25] [--workers 4]
+"""
+import argparse
+import tempfile
+import time
+
+import tts
+from tts import AudioCache, split_sentences
+
+DESCRIPTION = (
+    "The image shows a busy street market on a sunny afternoon. In the foreground, a vendor in a blue apron "
+    "arranges oranges, apples and bananas on a wooden stall. Behind him, a woman with a red umbrella is talking "
+    "to a child who is pointing at a balloon seller. On the left, several bicycles are parked against a brick "
+    "wall covered in posters. The sky is clear, and long shadows suggest it is late in the day. In the "
+    "background, a tram is passing between two tall buildings with balconies full of plants. Overall, the "
+    "scene feels lively and relaxed, with people going about their shopping."
+)
+
+
+class FakeTTS:
+    """gTTS stand-in: one simulated request per 100 characters, then a small MP3-sized file."""
+
+    latency = 0.25
+
+    def __init__(self, text, lang="en", slow=False, tld="com"):
+        self.text = text
+
+    def save(self, path):
+        requests = -(-len(self.text) // 100)
+        time.sleep(requests * self.latency)
+        with open(path, "wb") as f:
+            f.write(b"\xff\xfb" * (len(self.text) * 40))
+
+
+def whole_text(workers):
+    cache = AudioCache(tempfile.mkdtemp(), workers=workers)
+    start = time.perf_counter()
+    cache.synthesize(DESCRIPTION)
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed
+
+
+def streamed(workers):
+    cache = AudioCache(tempfile.mkdtemp(), workers=workers)
+    start = time.perf_counter()
+    files = cache.stream_files(cache.synthesize_stream(DESCRIPTION))
+    next(files)
+    first = time.perf_counter() - start
+    for _ in files:
+        pass
+    return first, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--real", action="store_true")
+    parser.add_argument("--latency", type=float, default=0.25)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    if not args.real:
+        FakeTTS.latency = args.latency
+        tts.gTTS = FakeTTS
+
+    source = "Google TTS" if args.real else f"synthetic stand-in, {args.latency:g}s per gTTS request"
+    print(f"{len(DESCRIPTION)} characters, {len(split_sentences(DESCRIPTION))} sentences ({source})")
+    print(f"{'mode':<22} {'first audio':>12} {'all audio':>10}")
+    for label, run in (("whole text", whole_text), (f"streamed, {args.workers} workers", streamed)):
+        first, total = run(args.workers)
+        print(f"{label:<22} {first:11.2f}s {total:9.2f}s")
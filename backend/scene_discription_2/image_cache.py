@@ -0,0 +1,189 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+DESCRIPTION_CACHE_CAPACITY = int(os.getenv("SCENE_DESCRIPTION_CACHE_CAPACITY", 1000))
+# Largest Hamming distance (out of 64 bits) at which two frames of one session count as the same scene
+DESCRIPTION_MAX_DISTANCE = int(os.getenv("SCENE_DESCRIPTION_MAX_DISTANCE", 4))
+# "phash" (DCT, more robust to recompression and small crops) or "dhash" (gradient, cheaper)
+IMAGE_HASH = os.getenv("SCENE_IMAGE_HASH", "phash")
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    return int("".join("1" if bit else "0" for bit in bits.flatten()), 2)
+
+
+def dhash(image: Image.Image, size: int = 8) -> int:
+    """Difference hash: whether each pixel is brighter than its right neighbour on a 9x8 thumbnail."""
+    pixels = np.asarray(image.convert("L").resize((size + 1, size), Image.Resampling.BILINEAR), dtype=np.int16)
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    matrix = np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n))
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+_DCT_32 = _dct_matrix(32)
+
+
+def phash(image: Image.Image, size: int = 8) -> int:
+    """Perceptual hash: low DCT frequencies of a 32x32 thumbnail compared with their median."""
+    pixels = np.asarray(image.convert("L").resize((32, 32), Image.Resampling.BILINEAR), dtype=np.float64)
+    frequencies = (_DCT_32 @ pixels @ _DCT_32.T)[:size, :size]
+    # The DC term only says how bright the image is overall
+    return _bits_to_int(frequencies > np.median(frequencies.flatten()[1:]))
+
+
+HASHES = {"dhash": dhash, "phash": phash}
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit hashes, for lookups within a Hamming distance.
+
+    Children are keyed by their distance to the parent, so the triangle
+    inequality rules out whole subtrees. Removed hashes stay in the tree as
+    tombstones, and the tree is rebuilt once they outnumber the live ones.
+    """
+
+    def __init__(self):
+        self.root: Optional[list] = None  # [hash, live, {distance: child}]
+        self.live = 0
+        self.dead = 0
+
+    def add(self, value: int) -> None:
+        self.live += 1
+        if self.root is None:
+            self.root = [value, True, {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                if not node[1]:
+                    node[1] = True
+                    self.dead -= 1
+                else:
+                    self.live -= 1
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, True, {}]
+                return
+            node = child
+
+    def remove(self, value: int) -> None:
+        node = self.root
+        while node is not None:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                if node[1]:
+                    node[1] = False
+                    self.live -= 1
+                    self.dead += 1
+                    if self.dead > self.live:
+                        self._rebuild()
+                return
+            node = node[2].get(distance)
+
+    def _rebuild(self) -> None:
+        values = list(self)
+        self.root, self.live, self.dead = None, 0, 0
+        for value in values:
+            self.add(value)
+
+    def __iter__(self):
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            if node[1]:
+                yield node[0]
+            stack.extend(node[2].values())
+
+    def search(self, value: int, max_distance: int) -> List[Tuple[int, int]]:
+        """(distance, hash) of every live hash within `max_distance`, closest first."""
+        found = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= max_distance and node[1]:
+                found.append((distance, node[0]))
+            for child_distance, child in node[2].items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        return sorted(found)
+
+
+class DescriptionCache:
+    """Image descriptions keyed by a perceptual hash of the preprocessed image.
+
+    A lookup returns the description of the closest stored image within
+    `max_distance` bits, so repeated or near-identical camera frames reuse it
+    instead of calling the vision model again. Users rely on the description
+    to know what is in front of them, so matches only come from images the
+    same `scope` (the user's session) stored. That includes an identical
+    hash: different pictures can share one, and another user's description
+    is never reused. The least recently used entry goes once `capacity` is
+    reached.
+    """
+
+    def __init__(self, capacity: int = DESCRIPTION_CACHE_CAPACITY, max_distance: int = DESCRIPTION_MAX_DISTANCE,
+                 hash_name: str = IMAGE_HASH):
+        self.capacity = capacity
+        self.max_distance = max_distance
+        self.hash_name = hash_name
+        self.hash_image = HASHES[hash_name]
+        self.entries: "OrderedDict[int, Dict]" = OrderedDict()  # hash -> {scope: description}, in LRU order
+        self.tree = BKTree()
+        self.lock = threading.Lock()
+        self.counters = {"exact_hits": 0, "near_hits": 0, "misses": 0, "evictions": 0}
+
+    def lookup(self, image: Image.Image, scope: Optional[str] = None) -> Tuple[int, Optional[Dict]]:
+        """(hash, {"description", "match", "distance"} or None); pass the hash on to `store`."""
+        image_hash = self.hash_image(image)
+        with self.lock:
+            for distance, stored_hash in self.tree.search(image_hash, self.max_distance):
+                descriptions = self.entries[stored_hash]
+                if scope not in descriptions:
+                    continue
+                self.entries.move_to_end(stored_hash)
+                match = "exact" if distance == 0 else "near"
+                self.counters[f"{match}_hits"] += 1
+                return image_hash, {"description": descriptions[scope], "match": match, "distance": distance}
+            self.counters["misses"] += 1
+            return image_hash, None
+
+    def store(self, image_hash: int, description: str, scope: Optional[str] = None) -> None:
+        with self.lock:
+            descriptions = self.entries.get(image_hash)
+            if descriptions is None:
+                self.tree.add(image_hash)
+                descriptions = self.entries[image_hash] = {}
+            descriptions[scope] = description
+            self.entries.move_to_end(image_hash)
+            while len(self.entries) > self.capacity:
+                old_hash, _ = self.entries.popitem(last=False)
+                self.tree.remove(old_hash)
+                self.counters["evictions"] += 1
+
+    def stats(self) -> Dict:
+        with self.lock:
+            stats = dict(self.counters)
+            stats["entries"] = len(self.entries)
+        lookups = stats["exact_hits"] + stats["near_hits"] + stats["misses"]
+        stats["vision_calls_avoided"] = stats["exact_hits"] + stats["near_hits"]
+        stats["hit_rate"] = round(stats["vision_calls_avoided"] / lookups, 4) if lookups else 0.0
+        stats["hash"] = self.hash_name
+        stats["max_distance"] = self.max_distance
+        return stats
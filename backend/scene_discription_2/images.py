@@ -0,0 +1,44 @@
+import base64
+import os
+from io import BytesIO
+
+from PIL import Image, ImageOps
+from flask import Request
+
+# Longest side of the image sent to the vision model; the aspect ratio is kept
+IMAGE_MAX_SIDE = int(os.getenv("SCENE_IMAGE_MAX_SIDE", 512))
+JPEG_QUALITY = int(os.getenv("SCENE_JPEG_QUALITY", 85))
+# Largest accepted upload, in bytes
+MAX_UPLOAD_BYTES = int(os.getenv("SCENE_MAX_UPLOAD_BYTES", 20 * 1024 * 1024))
+
+
+class InMemoryRequest(Request):
+    """Request whose uploaded files stay in memory instead of spilling to a temp file."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return BytesIO()
+
+
+def decode_image(stream, max_side: int = IMAGE_MAX_SIDE) -> Image.Image:
+    """Decode an uploaded image straight from its stream, upright, RGB and at most `max_side` pixels.
+
+    JPEGs are decoded in draft mode, which lets libjpeg scale by 1/2, 1/4 or
+    1/8 while decoding, so a 12 MP phone photo is never fully decoded. The
+    EXIF orientation is applied before resizing.
+    """
+    image = Image.open(stream)
+    if image.format == "JPEG":
+        # Draft keeps the result at least as large as requested; thumbnail() does the rest
+        image.draft("RGB", (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image.thumbnail((max_side, max_side), Image.Resampling.BICUBIC)
+    return image
+
+
+def image_to_base64(image: Image.Image, quality: int = JPEG_QUALITY) -> str:
+    """JPEG-encode a PIL image in memory and return it as base64."""
+    buffered = BytesIO()
+    image.save(buffered, format="JPEG", quality=quality)
+    return base64.b64encode(buffered.getvalue()).decode("utf-8")
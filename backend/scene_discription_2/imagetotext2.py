@@ -1,61 +1,69 @@
-from flask import Flask, request, jsonify, send_file, session
+from flask import Flask, Response, request, jsonify, send_file, send_from_directory, session
 import os
-from werkzeug.utils import secure_filename
-from PIL import Image
-import base64
-from io import BytesIO
-from groq import Groq
+import secrets
+import sys
+import uuid
 from dotenv import load_dotenv
-from gtts import gTTS
-from translate import Translator
+from gtts.lang import tts_langs
 from pydub import AudioSegment
-import uuid  # For generating unique file names
+
+# Make the shared backend helpers importable
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.llm import get_groq_client
+from image_cache import DescriptionCache
+from images import MAX_UPLOAD_BYTES, InMemoryRequest, decode_image, image_to_base64
+from pipeline import PipelineStats, StageTimer, TranslationFailed, Translations
+from tts import AudioCache
 
 # Load environment variables
 load_dotenv()
 
 # Initialize Flask app
 app = Flask(__name__)
-app.secret_key = "your_secret_key"  # Required for session management
-
-# Configure upload and audio folders
-UPLOAD_FOLDER = "uploads"
+app.secret_key = os.getenv("FLASK_SECRET_KEY")
+if not app.secret_key:
+    # A random key still signs sessions, but they end with the process and are not shared between workers
+    print("FLASK_SECRET_KEY is not set; using a random key for this process")
+    app.secret_key = secrets.token_hex(32)
+# Uploaded images are decoded from memory and never written to disk
+app.request_class = InMemoryRequest
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES
+
+# Configure the audio folder
 AUDIO_FOLDER = "audio"
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
 if not os.path.exists(AUDIO_FOLDER):
     os.makedirs(AUDIO_FOLDER)
-app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 app.config["AUDIO_FOLDER"] = AUDIO_FOLDER
 
-# Initialize Groq client
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Speech files named by the hash of their text and voice, swept by age and total size
+audio_cache = AudioCache(AUDIO_FOLDER)
+# Started with the app, so the folder is also swept under a WSGI server
+audio_cache.start_sweeper()
+# Cached audio never changes under its name, so clients may keep it
+AUDIO_MAX_AGE = 365 * 24 * 3600
+# Stream speech sentence by sentence, so playback starts before the whole text is synthesized
+TTS_STREAMING = os.getenv("TTS_STREAMING", "1") == "1"
 
-# Initialize translator
-translator = Translator(to_lang="en")  # Set default target language
+# Shared, rate-limited Groq client
+groq_client = get_groq_client()
 
-def preprocess_image(image):
-    """
-    Preprocess the image (resize, normalize, etc.) if needed.
-    """
-    image = image.resize((224, 224))  # Resize to 224x224 (adjust as needed)
-    return image
+# Descriptions of recent images, reused for repeated and near-identical frames
+description_cache = DescriptionCache()
 
-def image_to_base64(image):
-    """
-    Convert PIL image to base64.
-    """
-    buffered = BytesIO()
-    image.save(buffered, format="JPEG")
-    return base64.b64encode(buffered.getvalue()).decode("utf-8")
+# One translator per target language, with translations cached by (text, language)
+translations = Translations()
+# Descriptions are spoken, so only languages gTTS can speak are accepted
+SPEECH_LANGUAGES = set(tts_langs())
+
+# Average time of each /upload stage
+pipeline_stats = PipelineStats()
+# Wait this long at most for background speech before /audio gives up
+AUDIO_WAIT_SECONDS = 60
 
-def generate_description(image):
+def generate_description(image_base64):
     """
-    Send the image to the Groq model and get the description.
+    Send the base64 JPEG to the Groq model and get the description.
     """
-    # Convert image to base64
-    image_base64 = image_to_base64(image)
-
     # Call the Groq model
     response = groq_client.chat.completions.create(
         model="llama-3.2-11b-vision-preview",
@@ -73,22 +81,24 @@ def generate_description(image):
 
 def translate_text(text, dest_language="en"):
     """
-    Translate text to the desired language using the translate library.
+    Translate text to the desired language; English descriptions are returned as they are.
     """
-    translator = Translator(to_lang=dest_language)
-    translation = translator.translate(text)
-    return translation
+    return translations.translate(text, dest_language)
 
 def text_to_speech(text, language="en"):
     """
-    Convert text to speech using gTTS and save as an audio file with a unique name.
+    Convert text to speech using gTTS in the background and return the audio file name right away.
+    Files are reused when the same text was spoken before; /audio waits for one still being made.
+    """
+    return audio_cache.synthesize_async(text, language=language, slow=False)
+
+def speech_url(text, language="en"):
+    """
+    URL the client plays the speech for `text` from: a progressive stream, or the finished MP3.
     """
-    tts = gTTS(text=text, lang=language, slow=False)
-    # Generate a unique filename using UUID
-    audio_filename = f"{uuid.uuid4()}.mp3"
-    audio_path = os.path.join(app.config["AUDIO_FOLDER"], audio_filename)
-    tts.save(audio_path)
-    return audio_filename  # Return the unique filename
+    if TTS_STREAMING:
+        return f"/audio/stream/{audio_cache.synthesize_stream(text, language=language, slow=False)}"
+    return f"/audio/{text_to_speech(text, language=language)}"
 
 def convert_to_supported_format(audio_path, output_format="wav"):
     audio = AudioSegment.from_file(audio_path)
@@ -103,7 +113,8 @@ def home():
 @app.route("/upload", methods=["POST"])
 def upload_image():
     """
-    Handle image upload, generate description, translate, and convert to speech.
+    Handle image upload as a pipeline: decode, describe, translate, then speech in the background.
+    The response carries the time each stage took.
     """
     if "file" not in request.files:
         return jsonify({"error": "No file uploaded"}), 400
@@ -111,33 +122,56 @@ def upload_image():
     file = request.files["file"]
     if file.filename == "":
         return jsonify({"error": "No file selected"}), 400
+    language = request.form.get("language", "en")
+    if language not in SPEECH_LANGUAGES:
+        return jsonify({"error": f"Unsupported language: {language}"}), 400
 
     try:
-        # Save the uploaded file
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-        file.save(filepath)
-
-        # Load and preprocess the image
-        image = Image.open(filepath)
-        image = preprocess_image(image)
-
-        # Generate description
-        description = generate_description(image)
+        timer = StageTimer()
+
+        # Decode, orient and downscale the image straight from the request
+        with timer.stage("decode"):
+            image = decode_image(file.stream)
+
+        # The same scene was described recently: skip the vision model.
+        # Only this session's own images match, identical or near-identical.
+        scope = session.setdefault("scene_session", uuid.uuid4().hex)
+        with timer.stage("cache_lookup"):
+            image_hash, cached = description_cache.lookup(image, scope)
+        if cached:
+            description = cached["description"]
+        else:
+            # Generate description
+            with timer.stage("describe"):
+                description = generate_description(image_to_base64(image))
+            description_cache.store(image_hash, description, scope)
 
         # Store the description in the session
         session["image_description"] = description
 
-        # Translate description (optional)
-        translated_description = translate_text(description, dest_language="en")  # Change language as needed
-
-        # Convert description to speech
-        audio_filename = text_to_speech(translated_description, language="en")
+        # Translate description; a no-op for English
+        translation_error = None
+        with timer.stage("translate"):
+            try:
+                translated_description = translate_text(description, dest_language=language)
+            except TranslationFailed as e:
+                # Better the English description than the provider's warning read out as one
+                print(f"Translation to {language} failed: {e}")
+                translation_error = str(e)
+                translated_description, language = description, "en"
+
+        # Start the speech; the client fetches it while it is being synthesized
+        with timer.stage("speech"):
+            audio_url = speech_url(translated_description, language=language)
+        pipeline_stats.record(timer)
 
         # Return the description and audio file path
         return jsonify({
             "description": translated_description,
-            "audio_url": f"/audio/{audio_filename}"
+            "audio_url": audio_url,
+            "cache": {"match": cached["match"], "distance": cached["distance"]} if cached else None,
+            "translation_error": translation_error,
+            "timings_ms": timer.timings,
         })
 
     except Exception as e:
@@ -179,23 +213,63 @@ def ask_question():
         response_text = response.choices[0].message.content
 
         # Convert response to speech
-        audio_filename = text_to_speech(response_text, language="en")
+        audio_url = speech_url(response_text, language="en")
 
         # Return the response and audio file path
         return jsonify({
             "response": response_text,
-            "audio_url": f"/audio/{audio_filename}"
+            "audio_url": audio_url
         })
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/description-cache/stats")
+def description_cache_stats():
+    return jsonify(description_cache.stats())
+
+@app.route("/pipeline/stats")
+def pipeline_stats_route():
+    return jsonify({"stages": pipeline_stats.stats(), "translations": translations.stats()})
+
+@app.route("/audio-cache/stats")
+def audio_cache_stats():
+    return jsonify(audio_cache.stats())
+
+@app.route("/audio/stream/<key>")
+def stream_audio(key):
+    """
+    Serve a text's speech as one progressive MP3 stream, each sentence sent as soon as it is synthesized.
+    A finished stream is served as the cacheable MP3 of the whole text, with ETag and Range support.
+    """
+    if os.path.exists(audio_cache.path(f"{key}.mp3")):
+        return get_audio(f"{key}.mp3")
+    try:
+        filenames = audio_cache.stream_files(key)
+    except KeyError:
+        return jsonify({"error": "Unknown audio stream"}), 404
+
+    def generate():
+        # MP3 frames can be concatenated, so the sentence files play back to back
+        for filename in filenames:
+            with open(audio_cache.path(filename), "rb") as f:
+                yield f.read()
+
+    return Response(generate(), mimetype="audio/mpeg", headers={"Cache-Control": "no-cache"})
+
 @app.route("/audio/<filename>")
 def get_audio(filename):
     """
-    Serve the generated audio file.
+    Serve the generated audio file, with ETag and Range support so clients can cache and seek.
     """
-    return send_file(os.path.join(app.config["AUDIO_FOLDER"], filename))
+    try:
+        audio_cache.wait(filename, timeout=AUDIO_WAIT_SECONDS)
+    except Exception as e:
+        return jsonify({"error": f"Speech synthesis failed: {e}"}), 500
+    audio_cache.touch(filename)
+    # The name is the content hash, which makes a stable ETag; mtime changes on every use
+    return send_from_directory(app.config["AUDIO_FOLDER"], filename, conditional=True,
+                               etag=os.path.splitext(filename)[0], max_age=AUDIO_MAX_AGE)
 
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
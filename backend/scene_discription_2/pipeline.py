@@ -0,0 +1,112 @@
+import hashlib
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+from translate import Translator
+from translate.exceptions import TranslationError
+
+# Make the shared backend helpers importable
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.cache import SQLiteCache
+
+# The vision model describes images in English
+SOURCE_LANGUAGE = "en"
+TRANSLATION_TTL = float(os.getenv("SCENE_TRANSLATION_TTL", 30 * 24 * 3600))
+# MyMemory reports quota and request problems as the translated text itself, with a 200 status
+_PROVIDER_WARNING_RE = re.compile(
+    r"MYMEMORY WARNING|INVALID (SOURCE |TARGET )?LANGUAGE|PLEASE SELECT TWO DISTINCT LANGUAGES"
+    r"|QUERY LENGTH LIMIT|NO QUERY SPECIFIED"
+)
+
+
+class TranslationFailed(Exception):
+    """The translation provider answered with a warning instead of a translation."""
+
+
+class StageTimer:
+    """Wall time of each stage of one request, in milliseconds."""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round((time.perf_counter() - start) * 1000, 1)
+
+
+class PipelineStats:
+    """Running count and average time per stage across requests."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Dict[str, float]] = {}
+
+    def record(self, timer: StageTimer) -> None:
+        with self._lock:
+            for name, milliseconds in timer.timings.items():
+                stage = self._stages.setdefault(name, {"count": 0, "total_ms": 0.0})
+                stage["count"] += 1
+                stage["total_ms"] += milliseconds
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {name: {"count": stage["count"], "avg_ms": round(stage["total_ms"] / stage["count"], 1)}
+                    for name, stage in self._stages.items()}
+
+
+class Translations:
+    """Translate descriptions, reusing one Translator per target language and caching results.
+
+    Text already in the target language is returned as it is. Provider
+    warnings raise TranslationFailed and are never cached.
+    """
+
+    def __init__(self, source_language: str = SOURCE_LANGUAGE, cache: SQLiteCache = None):
+        self.source_language = source_language
+        self.cache = cache or SQLiteCache("scene_translations", ttl=TRANSLATION_TTL, max_entries=5000)
+        self._translators: Dict[str, Translator] = {}
+        self._lock = threading.Lock()
+        self.identity_skips = 0
+        self.provider_warnings = 0
+
+    def translator(self, language: str) -> Translator:
+        with self._lock:
+            if language not in self._translators:
+                self._translators[language] = Translator(to_lang=language, from_lang=self.source_language)
+            return self._translators[language]
+
+    def translate(self, text: str, language: str) -> str:
+        if language == self.source_language:
+            with self._lock:
+                self.identity_skips += 1
+            return text
+        key = f"{language}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+        def compute():
+            try:
+                translated = self.translator(language).translate(text)
+            except TranslationError as e:
+                raise TranslationFailed(str(e)) from e
+            if _PROVIDER_WARNING_RE.search(translated):
+                with self._lock:
+                    self.provider_warnings += 1
+                raise TranslationFailed(translated)
+            return translated
+
+        return self.cache.get_or_compute(key, compute)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = {"identity_skips": self.identity_skips, "provider_warnings": self.provider_warnings,
+                     "translators": len(self._translators)}
+        stats["cache"] = dict(self.cache.counters)
+        return stats
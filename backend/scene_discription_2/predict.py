@@ -1,44 +1,84 @@
-from transformers import VisionEncoderDecoderModel, ViTImageProcessor, AutoTokenizer
-import torch
+from io import BytesIO
 from PIL import Image
-from gtts import gTTS
 import os
-import uuid
-from googletrans import Translator  # Add this import
+import sys
+import threading
 
-# Load the model, feature extractor, and tokenizer
-model = VisionEncoderDecoderModel.from_pretrained("nlpconnect/vit-gpt2-image-captioning")
-feature_extractor = ViTImageProcessor.from_pretrained("nlpconnect/vit-gpt2-image-captioning")
-tokenizer = AutoTokenizer.from_pretrained("nlpconnect/vit-gpt2-image-captioning")
+# Make the shared backend helpers importable
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.resources import ResourceRegistry
+from batcher import MicroBatcher
+from tts import AudioCache
 
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-model.to(device)
+MODEL_NAME = "nlpconnect/vit-gpt2-image-captioning"
 
 # Configuration for text generation
 max_length = 16
 num_beams = 4
 gen_kwargs = {"max_length": max_length, "num_beams": num_beams}
 
-# Initialize the translator
-translator = Translator()
+def load_captioner():
+    """Load the model, feature extractor, and tokenizer"""
+    # torch and transformers take seconds to import, so they are only imported here
+    import torch
+    from transformers import VisionEncoderDecoderModel, ViTImageProcessor, AutoTokenizer
 
-def predict_step(image_paths):
-    images = []
-    for image_path in image_paths:
-        i_image = Image.open(image_path)
-        if i_image.mode != "RGB":
-            i_image = i_image.convert(mode="RGB")
-        images.append(i_image)
+    model = VisionEncoderDecoderModel.from_pretrained(MODEL_NAME)
+    feature_extractor = ViTImageProcessor.from_pretrained(MODEL_NAME)
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model.to(device)
+    return model, feature_extractor, tokenizer, device
+
+def load_translator():
+    from googletrans import Translator
+    return Translator()
+
+# Heavy objects are built on first use, or by resources.start_warm_up()
+resources = ResourceRegistry()
+captioner = resources.register("captioner", load_captioner)
+translator = resources.register("translator", load_translator)
+
+def load_image(image):
+    """Open an image given as a path, raw bytes, a file object or a PIL image, as RGB"""
+    if isinstance(image, bytes):
+        image = BytesIO(image)
+    if not isinstance(image, Image.Image):
+        image = Image.open(image)
+    if image.mode != "RGB":
+        image = image.convert(mode="RGB")
+    return image
+
+def caption_batch(images):
+    """Caption a list of images with one batched generate call"""
+    import torch
+
+    model, feature_extractor, tokenizer, device = captioner.get()
 
     # Add padding to handle images of different sizes
-    pixel_values = feature_extractor(images=images, return_tensors="pt", padding=True).pixel_values
+    pixel_values = feature_extractor(images=[load_image(image) for image in images], return_tensors="pt",
+                                     padding=True).pixel_values
     pixel_values = pixel_values.to(device)
 
-    output_ids = model.generate(pixel_values, **gen_kwargs)
+    with torch.inference_mode():
+        output_ids = model.generate(pixel_values, **gen_kwargs)
     preds = tokenizer.batch_decode(output_ids, skip_special_tokens=True)
     preds = [pred.strip() for pred in preds]
     return preds
 
+# Concurrent caption requests are grouped into one generate call per batch
+caption_batcher = MicroBatcher(caption_batch, name="caption-batcher")
+
+def predict_step(image_paths):
+    """Captions for a list of images (paths, bytes, file objects or PIL images).
+
+    The images join the micro-batch queue, so single-image calls made at the
+    same time from different threads share a generate call.
+    """
+    # Decode on the calling thread, so the batch worker only runs the model
+    return caption_batcher.map([load_image(image) for image in image_paths])
+
 def translate_text(text, dest_language="hi"):
     """
     Translate text to the specified language.
@@ -51,32 +91,36 @@ def translate_text(text, dest_language="hi"):
         str: The translated text.
     """
     try:
-        translated = translator.translate(text, dest=dest_language)
+        translated = translator.get().translate(text, dest=dest_language)
         return translated.text
     except Exception as e:
         print(f"Translation failed: {e}")
         return text  # Return the original text if translation fails
 
+# One content-addressed audio cache per output folder
+audio_caches = {}
+audio_caches_lock = threading.Lock()
+
 def text_to_speech(text, output_folder="static", language="en"):
     """
     Convert text to speech and save it as an MP3 file.
 
     Args:
         text (str): The text to convert to speech.
-        output_folder (str): The folder to save the audio file.
+        output_folder (str): The folder to save the audio file in; the file goes
+            in its "audio" subfolder, which the cache sweeps.
         language (str): The language code (e.g., "en" for English, "hi" for Hindi).
 
     Returns:
         str: The path to the saved audio file.
     """
-    # Ensure the output folder exists
-    os.makedirs(output_folder, exist_ok=True)
-
-    # Generate a unique filename
-    unique_id = uuid.uuid4().hex
-    output_file = os.path.join(output_folder, f"output_{unique_id}.mp3")
-
-    # Convert text to speech in the specified language
-    tts = gTTS(text=text, lang=language)
-    tts.save(output_file)
-    return output_file
\ No newline at end of file
+    # The same text and language are only synthesized once per folder.
+    # The sweeper deletes old MP3s, so it only gets a subfolder of its own.
+    cache_folder = os.path.join(output_folder, "audio")
+    with audio_caches_lock:
+        cache = audio_caches.get(cache_folder)
+        if cache is None:
+            # Under the lock, so concurrent first calls do not start two pools and sweepers
+            cache = audio_caches[cache_folder] = AudioCache(cache_folder)
+            cache.start_sweeper()
+    return cache.path(cache.synthesize(text, language=language))
\ No newline at end of file
@@ -0,0 +1,299 @@
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from gtts import gTTS
+
+# Make the shared backend helpers importable
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.cache import SingleFlight
+
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+# Files not played or synthesized for this long are deleted
+TTS_CACHE_MAX_AGE = float(os.getenv("TTS_CACHE_MAX_AGE", 7 * 24 * 3600))
+TTS_CACHE_SWEEP_INTERVAL = float(os.getenv("TTS_CACHE_SWEEP_INTERVAL", 600))
+# Leftovers of synthesis that died half way; younger ones may still be being written
+STALE_PART_AGE = 3600
+# A failed background synthesis is reported to /audio requests for this long
+FAILED_SYNTHESIS_TTL = 300
+# Sentences synthesized at the same time for one streamed text
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", 4))
+
+_KEY_RE = re.compile(r"[0-9a-f]{64}")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+# Fragments shorter than this ("Dr.", "1.") are joined to the sentence before them
+MIN_SENTENCE_CHARS = 20
+
+
+def audio_key(text: str, language: str = "en", slow: bool = False, tld: str = "com") -> str:
+    """Content address of the speech for `text` with these voice settings."""
+    settings = {"engine": "gtts", "text": text, "lang": language, "slow": slow, "tld": tld}
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences, the units synthesized and streamed one by one."""
+    sentences: List[str] = []
+    for part in _SENTENCE_END_RE.split(text.strip()):
+        part = part.strip()
+        if not part:
+            continue
+        if sentences and len(sentences[-1]) < MIN_SENTENCE_CHARS:
+            sentences[-1] = f"{sentences[-1]} {part}"
+        else:
+            sentences.append(part)
+    return sentences
+
+
+class AudioCache:
+    """gTTS MP3s stored under the hash of (text, language, voice settings).
+
+    The same phrase is synthesized once and then served from disk. A file's
+    modification time is its last use: hits touch it, and the sweeper deletes
+    files unused for `max_age` seconds, then the least recently used ones
+    until the folder is under `max_bytes`. Anything else ending in .mp3 in
+    the folder, such as files from before the cache, is swept the same way.
+
+    Long texts can also be streamed: each sentence becomes its own cached MP3,
+    synthesized concurrently. Once all are done they are joined into the MP3
+    of the whole text, which is then served like any other cached file. A
+    `<key>.json` manifest keeps the text of each stream on disk, so it does
+    not depend on the process that started it.
+    """
+
+    def __init__(self, folder: str, max_bytes: int = TTS_CACHE_MAX_BYTES, max_age: float = TTS_CACHE_MAX_AGE,
+                 workers: int = TTS_WORKERS):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(folder, exist_ok=True)
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts")
+        self._streams: Dict[str, List[Future]] = {}  # key -> sentence futures, until they are joined
+        self._pending: Dict[str, Future] = {}  # file name -> background synthesis, until it is on disk
+        self._failed: Dict[str, Tuple[Exception, float]] = {}  # file name -> (error, time) of a failed synthesis
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0, "swept_files": 0, "swept_bytes": 0,
+                         "streams": 0}
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += amount
+
+    def path(self, filename: str) -> str:
+        return os.path.join(self.folder, filename)
+
+    def touch(self, filename: str) -> None:
+        try:
+            os.utime(self.path(filename))
+        except OSError:
+            pass
+
+    def synthesize(self, text: str, language: str = "en", slow: bool = False, tld: str = "com") -> str:
+        """File name of the MP3 for `text`, synthesizing it only if it is not on disk yet."""
+        filename = f"{audio_key(text, language, slow, tld)}.mp3"
+        path = self.path(filename)
+        if os.path.exists(path):
+            self.touch(filename)
+            self._count("hits")
+            return filename
+
+        def save():
+            if not os.path.exists(path):
+                # Write under a temporary name, so a half-written file is never served
+                partial = f"{path}.{threading.get_ident()}.part"
+                gTTS(text=text, lang=language, slow=slow, tld=tld).save(partial)
+                os.replace(partial, path)
+            return filename
+
+        _, shared = self._flight.do(filename, save)
+        self._count("coalesced" if shared else "misses")
+        return filename
+
+    def synthesize_async(self, text: str, language: str = "en", slow: bool = False, tld: str = "com") -> str:
+        """File name the MP3 for `text` will have; synthesis runs in the background. See `wait`."""
+        filename = f"{audio_key(text, language, slow, tld)}.mp3"
+        if os.path.exists(self.path(filename)):
+            self.touch(filename)
+            self._count("hits")
+            return filename
+        with self._lock:
+            future = self._pending.get(filename)
+            started = future is None
+            if started:
+                self._failed.pop(filename, None)
+                future = self._pending[filename] = self._pool.submit(self.synthesize, text, language, slow, tld)
+
+        def synthesized(done):
+            with self._lock:
+                self._pending.pop(filename, None)
+                # Kept for a while, so /audio reports the error instead of a missing file
+                if done.exception() is not None:
+                    now = time.time()
+                    self._failed[filename] = (done.exception(), now)
+                    for name, (_, failed_at) in list(self._failed.items()):
+                        if now - failed_at > FAILED_SYNTHESIS_TTL:
+                            del self._failed[name]
+
+        if started:
+            future.add_done_callback(synthesized)
+        return filename
+
+    def wait(self, filename: str, timeout: Optional[float] = None) -> None:
+        """Block until a file from `synthesize_async` is on disk; re-raises a synthesis error."""
+        with self._lock:
+            future = self._pending.get(filename)
+            failed = self._failed.get(filename)
+        if future is not None:
+            future.result(timeout)
+        elif failed is not None and time.time() - failed[1] <= FAILED_SYNTHESIS_TTL:
+            raise failed[0]
+
+    def synthesize_stream(self, text: str, language: str = "en", slow: bool = False, tld: str = "com") -> str:
+        """Start synthesizing `text` sentence by sentence in the background; returns its stream key."""
+        key = audio_key(text, language, slow, tld)
+        # Done before: the sentences were joined into the MP3 of the whole text
+        if os.path.exists(self.path(f"{key}.mp3")):
+            self.touch(f"{key}.mp3")
+            return key
+        self._write_manifest(key, {"text": text, "language": language, "slow": slow, "tld": tld})
+        with self._lock:
+            if key in self._streams:
+                return key
+            futures = [self._pool.submit(self.synthesize, sentence, language, slow, tld)
+                       for sentence in split_sentences(text) or [text]]
+            self._streams[key] = futures
+            self.counters["streams"] += 1
+
+        remaining = [len(futures)]
+
+        def sentence_done(_):
+            with self._lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            self._finish_stream(key, futures)
+
+        for future in futures:
+            future.add_done_callback(sentence_done)
+        return key
+
+    def _finish_stream(self, key: str, futures: List[Future]) -> None:
+        """Join the sentences into `<key>.mp3` once all are on disk; a failed stream is forgotten so it can be retried."""
+        try:
+            if all(future.exception() is None for future in futures):
+                path = self.path(f"{key}.mp3")
+                partial = f"{path}.{threading.get_ident()}.part"
+                # MP3 frames can be concatenated, so the sentence files make one playable file
+                with open(partial, "wb") as out:
+                    for future in futures:
+                        with open(self.path(future.result()), "rb") as f:
+                            out.write(f.read())
+                os.replace(partial, path)
+        except OSError as e:
+            print(f"Error joining audio stream {key}: {e}")
+        finally:
+            with self._lock:
+                self._streams.pop(key, None)
+
+    def _write_manifest(self, key: str, settings: Dict) -> None:
+        """Record what a stream speaks, so any process sharing the folder can (re)synthesize it."""
+        path = self.path(f"{key}.json")
+        if os.path.exists(path):
+            self.touch(f"{key}.json")
+            return
+        partial = f"{path}.{threading.get_ident()}.part"
+        with open(partial, "w") as f:
+            json.dump(settings, f)
+        os.replace(partial, path)
+
+    def _manifest(self, key: str) -> Optional[Dict]:
+        try:
+            with open(self.path(f"{key}.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def stream_files(self, key: str) -> Iterator[str]:
+        """File names of a stream's sentences in order, each as soon as it is synthesized.
+
+        A finished stream is the single MP3 of the whole text. A stream this
+        process does not know, because another worker started it or its files
+        were swept, is synthesized again from its manifest. Raises KeyError
+        for an unknown stream, before anything is yielded.
+        """
+        if not _KEY_RE.fullmatch(key):
+            raise KeyError(key)
+        filename = f"{key}.mp3"
+        with self._lock:
+            futures = self._streams.get(key)
+        if futures is None:
+            if not os.path.exists(self.path(filename)):
+                settings = self._manifest(key)
+                if settings is None:
+                    raise KeyError(key)
+                self.synthesize_stream(**settings)
+                with self._lock:
+                    futures = self._streams.get(key)
+            if futures is None:
+                if not os.path.exists(self.path(filename)):
+                    raise KeyError(key)
+                self.touch(filename)
+                return iter([filename])
+        return (future.result() for future in futures)
+
+    def sweep(self) -> int:
+        """Delete expired files, then the least recently used ones over the size limit."""
+        now = time.time()
+        files = []
+        for entry in os.scandir(self.folder):
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            if entry.name.endswith((".mp3", ".json")) or (entry.name.endswith(".part") and now - stat.st_mtime > STALE_PART_AGE):
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for mtime, size, path in files:
+            if now - mtime <= self.max_age and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+            self._count("swept_bytes", size)
+        self._count("swept_files", removed)
+        return removed
+
+    def start_sweeper(self, interval: float = TTS_CACHE_SWEEP_INTERVAL) -> None:
+        """Sweep now and then every `interval` seconds on a daemon thread."""
+        if self._sweeper is not None:
+            return
+
+        def run():
+            while True:
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print(f"Error sweeping audio cache: {e}")
+                time.sleep(interval)
+
+        self._sweeper = threading.Thread(target=run, name="audio-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.counters)
+        sizes = [entry.stat().st_size for entry in os.scandir(self.folder) if entry.name.endswith(".mp3")]
+        stats.update(files=len(sizes), bytes=sum(sizes), max_bytes=self.max_bytes, max_age=self.max_age)
+        return stats
@@ -0,0 +1,162 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+ANSWER_CACHE_CAPACITY = int(os.getenv("TALK2PDF_ANSWER_CACHE_CAPACITY", 2000))
+ANSWER_CACHE_TTL = float(os.getenv("TALK2PDF_ANSWER_CACHE_TTL", 24 * 3600))
+# Cosine similarity between question embeddings above which a stored answer is reused
+ANSWER_SIMILARITY_THRESHOLD = float(os.getenv("TALK2PDF_ANSWER_SIMILARITY_THRESHOLD", 0.95))
+
+
+def normalize_question(question: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", question.lower()).split())
+
+
+class _DocumentAnswers:
+    """Answers for one document, with their question embeddings stacked for search."""
+
+    def __init__(self):
+        self.entries: Dict[str, Dict] = {}
+        self._matrix: Optional[np.ndarray] = None
+        self._keys: List[str] = []
+
+    def add(self, key: str, entry: Dict) -> None:
+        self.entries[key] = entry
+        self._matrix = None
+
+    def remove(self, key: str) -> None:
+        self.entries.pop(key, None)
+        self._matrix = None
+
+    def nearest(self, query: np.ndarray):
+        """(key, similarity) of the closest stored question, or None."""
+        if not self.entries:
+            return None
+        if self._matrix is None:
+            self._keys = list(self.entries)
+            self._matrix = np.stack([self.entries[key]["embedding"] for key in self._keys])
+        scores = self._matrix @ query
+        best = int(np.argmax(scores))
+        return self._keys[best], float(scores[best])
+
+
+class AnswerCache:
+    """/ask answers per document, matched exactly or by question embedding similarity.
+
+    Entries are keyed by document id (the SHA-256 of the PDF) and the
+    normalised question. Only the asking document's entries are searched, so
+    answers never cross documents. Entries expire after `ttl` seconds and the
+    least recently used one goes once `capacity` is reached. `invalidate`
+    drops a document's answers when its collection is rebuilt or evicted.
+    """
+
+    def __init__(self, capacity: int = ANSWER_CACHE_CAPACITY, ttl: Optional[float] = ANSWER_CACHE_TTL,
+                 threshold: float = ANSWER_SIMILARITY_THRESHOLD):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.threshold = threshold
+        self.lru: "OrderedDict[tuple, None]" = OrderedDict()  # (document id, key), least recent first
+        self.documents: Dict[str, _DocumentAnswers] = {}
+        self.lock = threading.Lock()
+        self.counters = {"exact_hits": 0, "similar_hits": 0, "misses": 0, "evictions": 0, "expired": 0,
+                         "invalidated": 0}
+
+    @staticmethod
+    def exact_key(question: str) -> str:
+        return hashlib.sha256(normalize_question(question).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _unit(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expired(self, entry: Dict) -> bool:
+        return self.ttl is not None and time.time() - entry["created_at"] > self.ttl
+
+    def _remove(self, document_id: str, key: str) -> None:
+        """Caller holds the lock."""
+        self.lru.pop((document_id, key), None)
+        answers = self.documents.get(document_id)
+        if answers is not None:
+            answers.remove(key)
+            if not answers.entries:
+                del self.documents[document_id]
+
+    def lookup(self, document_id: str, question: str, intent: str,
+               embed: Callable[[], Optional[List[float]]]) -> Optional[Dict]:
+        """Return {"result", "match", "similarity"} for a stored answer, or None.
+
+        `embed()` returns the question embedding. It is only called, outside
+        the lock, when there is no exact match and the document has answers
+        to compare with. A similar question only counts when it was routed
+        to the same intent, so "list important questions" never gets a plain
+        answer back.
+        """
+        key = self.exact_key(question)
+        with self.lock:
+            answers = self.documents.get(document_id)
+            match = (key, 1.0, "exact") if answers is not None and key in answers.entries else None
+        if match is None and answers is not None:
+            embedding = embed()
+            if embedding is not None:
+                with self.lock:
+                    answers = self.documents.get(document_id)
+                    nearest = answers.nearest(self._unit(embedding)) if answers is not None else None
+                    if nearest and nearest[1] >= self.threshold:
+                        match = (nearest[0], nearest[1], "similar")
+        with self.lock:
+            answers = self.documents.get(document_id)
+            if match is not None and answers is not None and match[0] in answers.entries:
+                key, similarity, kind = match
+                entry = answers.entries[key]
+                if self._expired(entry):
+                    self._remove(document_id, key)
+                    self.counters["expired"] += 1
+                elif entry["intent"] == intent:
+                    self.lru.move_to_end((document_id, key))
+                    self.counters[f"{kind}_hits"] += 1
+                    return {"result": entry["result"], "match": kind, "similarity": round(similarity, 4)}
+            self.counters["misses"] += 1
+            return None
+
+    def store(self, document_id: str, question: str, embedding, intent: str, result: Dict) -> None:
+        if embedding is None:
+            return
+        key = self.exact_key(question)
+        entry = {"embedding": self._unit(embedding), "intent": intent, "result": result, "created_at": time.time()}
+        with self.lock:
+            self.documents.setdefault(document_id, _DocumentAnswers()).add(key, entry)
+            self.lru[(document_id, key)] = None
+            self.lru.move_to_end((document_id, key))
+            while len(self.lru) > self.capacity:
+                (old_document, old_key), _ = self.lru.popitem(last=False)
+                self._remove(old_document, old_key)
+                self.counters["evictions"] += 1
+
+    def invalidate(self, document_id: str) -> None:
+        """Forget every answer for a document."""
+        with self.lock:
+            answers = self.documents.pop(document_id, None)
+            if answers is None:
+                return
+            for key in answers.entries:
+                self.lru.pop((document_id, key), None)
+            self.counters["invalidated"] += len(answers.entries)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            stats = dict(self.counters)
+            stats["entries"] = len(self.lru)
+            stats["documents"] = len(self.documents)
+        lookups = stats["exact_hits"] + stats["similar_hits"] + stats["misses"]
+        stats["llm_calls_avoided"] = stats["exact_hits"] + stats["similar_hits"]
+        stats["hit_rate"] = round(stats["llm_calls_avoided"] / lookups, 4) if lookups else 0.0
+        stats["threshold"] = self.threshold
+        return stats
@@ -0,0 +1,87 @@
+"""Benchmark PDF ingestion throughput (pages per second) at different pool sizes.
+
+Embedding and the database write are replaced by fast local stand-ins, so
+the numbers show extraction, chunking and pipeline overhead only. Without a
+PDF argument a synthetic text-only PDF is generated.
+Run from this folder:  python bench_ingest.py [file.pdf] [--pages 300]
+"""
+import argparse
+import os
+import tempfile
+import time
+import zlib
+
+from phi.knowledge.pdf import PDFReader
+
+from ingest import ingest_pdf
+
+LINE = "Section {page}.{line}: the derivative of a function measures how its output changes with its input."
+
+
+def write_sample_pdf(path, pages, lines_per_page=40):
+    """Minimal PDF writer: one Helvetica text stream per page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(pages):
+        text = "".join(f"({LINE.format(page=page + 1, line=line + 1)}) Tj T* " for line in range(lines_per_page))
+        stream = f"BT /F1 9 Tf 11 TL 40 800 Td {text}ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents {content_id} 0 R"
+                       f" /Resources << /Font << /F1 3 0 R >> >> >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+
+    body, offsets = b"%PDF-1.4\n", []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(body)
+    body += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    body += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    body += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF".encode()
+    with open(path, "wb") as f:
+        f.write(body)
+
+
+def fake_embed(texts):
+    # Cheap deterministic vectors; a real embedder is network-bound and batched the same way
+    return [[zlib.crc32(text.encode()) / 2 ** 32] * 8 for text in texts]
+
+
+def legacy_read(path):
+    """What PDFKnowledgeBase.load() did before: PDFReader(chunk=True) on the request thread."""
+    return len(PDFReader(chunk=True).read(path))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pdf", nargs="?")
+    parser.add_argument("--pages", type=int, default=300)
+    args = parser.parse_args()
+
+    path = args.pdf
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), "sample.pdf")
+        write_sample_pdf(path, args.pages)
+
+    chunker = PDFReader(chunk=True).chunk_document
+    pages = {}
+
+    def progress(done, total):
+        pages["total"] = total
+
+    start = time.perf_counter()
+    chunks = legacy_read(path)
+    elapsed = time.perf_counter() - start
+    print(f"{'PDFReader.read':<16} {elapsed:7.2f}s  {'':>14}  {chunks} chunks")
+
+    for workers in (1, 2, 4, 8):
+        # The server keeps its extraction pools between uploads: time an upload after the first
+        ingest_pdf(path, "sample", embed=fake_embed, write=lambda documents: None,
+                   chunker=chunker, workers=workers)
+        start = time.perf_counter()
+        chunks = ingest_pdf(path, "sample", embed=fake_embed, write=lambda documents: None,
+                            chunker=chunker, workers=workers, progress=progress)
+        elapsed = time.perf_counter() - start
+        print(f"{workers} worker(s){'':<6} {elapsed:7.2f}s  {pages['total'] / elapsed:8.1f} pages/s  {chunks} chunks")
@@ -0,0 +1,76 @@
+"""Benchmark the BM25 lexical index: build, persist, load and per-query latency.
+
+Chunks are synthetic: words drawn from a Zipf-distributed vocabulary, about
+the size of PDFReader chunks, with section numbers and acronyms sprinkled in
+so exact-term queries have something to find. RRF fusion with a second
+ranked list is timed as well.
+Run from this folder:  python bench_lexical.py [--chunks 5000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from lexical import LexicalIndex, content_key, reciprocal_rank_fusion
+
+
+class Chunk:
+    def __init__(self, number, content):
+        self.name = "sample"
+        self.meta_data = {"chunk": number}
+        self.content = content
+
+
+def make_chunks(count, words_per_chunk=450, vocabulary=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    words = np.array([f"w{index}" for index in range(vocabulary)])
+    chunks = []
+    for number in range(count):
+        drawn = words[np.minimum(rng.zipf(1.2, words_per_chunk), vocabulary) - 1].tolist()
+        drawn += [f"{number % 40}.{number % 7}", f"ACR{number % 500}"]
+        chunks.append(Chunk(number, " ".join(drawn)))
+    return chunks
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.chunks)
+    path = os.path.join(tempfile.mkdtemp(), "bench")
+
+    start = time.perf_counter()
+    index = LexicalIndex(path)
+    for offset in range(0, len(chunks), 64):
+        # Batches of the size the ingestion pipeline writes
+        index.add(chunks[offset:offset + 64])
+    index.save()
+    print(f"build + save {args.chunks} chunks: {time.perf_counter() - start:.2f}s, "
+          f"postings file {os.path.getsize(os.path.join(path, 'postings.npz')) / 1e6:.1f} MB")
+
+    start = time.perf_counter()
+    index = LexicalIndex(path)
+    print(f"load: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    rng = np.random.default_rng(1)
+    queries = [f"what does section {rng.integers(40)}.{rng.integers(7)} say about ACR{rng.integers(500)} w{rng.integers(2000)}"
+               for _ in range(args.queries)]
+    latencies, fusion = [], []
+    for query in queries:
+        start = time.perf_counter()
+        lexical = [document["content"] for document in index.search(query, 10)]
+        latencies.append(time.perf_counter() - start)
+        vector = [chunk.content for chunk in chunks[:10]]
+        start = time.perf_counter()
+        reciprocal_rank_fusion([vector, lexical], key=content_key, limit=5)
+        fusion.append(time.perf_counter() - start)
+    print(f"bm25 search  p50 {percentile(latencies, 50):6.2f} ms  p95 {percentile(latencies, 95):6.2f} ms")
+    print(f"rrf fusion   p50 {percentile(fusion, 50):6.2f} ms  p95 {percentile(fusion, 95):6.2f} ms")
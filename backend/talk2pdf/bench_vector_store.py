@@ -0,0 +1,83 @@
+"""Benchmark NumpyVectorDb search: recall@10 and latency of the IVF index against brute force.
+
+Vectors are synthetic embeddings shaped like real ones: they span a
+low-dimensional subspace, and chunks spread widely around overlapping
+subtopics of a few broad topics, so neighbours often sit in different IVF
+clusters. Queries are paraphrases, i.e. perturbed chunks. No embedder or
+network is used; queries are vectors too.
+Run from this folder:  python bench_vector_store.py [--rows 100000] [--dim 384]
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from vector_store import NumpyVectorDb
+
+
+class VectorEmbedder:
+    """Stands in for an embedder; the benchmark searches with vectors directly."""
+
+    def __init__(self, dimensions):
+        self.dimensions = dimensions
+
+
+class Chunk:
+    def __init__(self, number, embedding):
+        self.id = f"chunk_{number}"
+        self.name = "sample"
+        self.meta_data = {"chunk": number}
+        self.content = f"chunk {number}"
+        self.usage = None
+        self.embedding = embedding
+
+
+def synthetic_embeddings(rows, queries, dim, latent=64, topics=40, subtopics=800, seed=0):
+    """(chunk vectors, query vectors) with the overlapping cluster structure of text embeddings."""
+    rng = np.random.default_rng(seed)
+    basis = rng.normal(size=(latent, dim)) / np.sqrt(latent)
+    topic_centres = rng.normal(size=(topics, latent))
+    subtopic_centres = topic_centres[rng.integers(0, topics, subtopics)] + 0.3 * rng.normal(size=(subtopics, latent))
+    # Chunks spread further from their subtopic than subtopics from each other, so clusters overlap
+    chunks = subtopic_centres[rng.integers(0, subtopics, rows)] + rng.normal(size=(rows, latent))
+    paraphrases = chunks[rng.integers(0, rows, queries)] + 0.3 * rng.normal(size=(queries, latent))
+    vectors = chunks @ basis + 0.05 * rng.normal(size=(rows, dim))
+    return vectors.astype(np.float32), (paraphrases @ basis).astype(np.float32)
+
+
+def timed_search(vector_db, queries, k):
+    results, start = [], time.perf_counter()
+    for query in queries:
+        results.append(set(vector_db.search_rows(query, k).tolist()))
+    return results, (time.perf_counter() - start) / len(queries) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    vectors, queries = synthetic_embeddings(args.rows, args.queries, args.dim)
+
+    root = tempfile.mkdtemp()
+    flat = NumpyVectorDb("bench", path=root, embedder=VectorEmbedder(args.dim), index="flat")
+    start = time.perf_counter()
+    for offset in range(0, args.rows, 5000):
+        flat.insert_embedded([Chunk(offset + i, vector) for i, vector in enumerate(vectors[offset:offset + 5000])])
+    print(f"insert {args.rows} rows: {time.perf_counter() - start:.2f}s")
+
+    exact, flat_ms = timed_search(flat, queries, args.k)
+    print(f"{'brute force':<16} {flat_ms:7.2f} ms/query  recall@{args.k} 1.000")
+
+    for nprobe in (4, 8, 16, 32):
+        ivf = NumpyVectorDb("bench", path=root, embedder=VectorEmbedder(args.dim), index="ivf", nprobe=nprobe, ivf_min_rows=0)
+        start = time.perf_counter()
+        ivf.optimize()
+        build = time.perf_counter() - start
+        found, ivf_ms = timed_search(ivf, queries, args.k)
+        recall = np.mean([len(a & b) / args.k for a, b in zip(exact, found)])
+        print(f"ivf nprobe={nprobe:<5} {ivf_ms:7.2f} ms/query  recall@{args.k} {recall:.3f}  (index built in {build:.1f}s)")
@@ -0,0 +1,129 @@
+import hashlib
+import os
+import re
+import sys
+from typing import Dict, List, Tuple
+
+# Make the shared backend helpers importable
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.llm import count_tokens
+
+# Context tokens per model: the context window minus room for the instructions and the answer
+CONTEXT_BUDGETS = {
+    "gemma2-9b-it": 3000,
+    "llama-3.1-8b-instant": 6000,
+    "llama-3.3-70b-versatile": 6000,
+}
+DEFAULT_CONTEXT_BUDGET = int(os.getenv("TALK2PDF_CONTEXT_TOKENS", 3000))
+# knowledge_base.search returned this many chunks by default before candidates were packed
+LEGACY_SEARCH_RESULTS = 2
+# Chunks whose word trigrams overlap at least this much count as duplicates
+DUPLICATE_SIMILARITY = 0.8
+
+ANSWER, IMPORTANT_QUESTIONS = "answer", "important_questions"
+
+_IMPORTANT_QUESTIONS_RE = re.compile(
+    r"\b(important|key|likely|possible|exam|practice|sample|revision)\s+(exam\s+)?questions\b"
+    r"|\b(generate|give|make|create|list|write|suggest)\s+(me\s+)?(\d+\s+|some\s+|a\s+few\s+)?(\w+\s+)?questions\b"
+    r"|\bquiz\s+me\b",
+    re.IGNORECASE,
+)
+
+PROMPTS = {
+    ANSWER: (
+        "Context: {context}\n\nQuestion: {question}\n\nAnswer the question based only on the context provided. "
+        "Format the response using Markdown for proper spacing, paragraphs, and bold headings."
+    ),
+    IMPORTANT_QUESTIONS: (
+        "Context: {context}\n\nRequest: {question}\n\nGenerate 5 important questions based on the provided context. "
+        "Format the response using Markdown for proper spacing, paragraphs, and bold headings."
+    ),
+}
+
+
+def classify_intent(question: str) -> str:
+    """Decide up front what the user wants, so /ask makes one LLM call."""
+    return IMPORTANT_QUESTIONS if _IMPORTANT_QUESTIONS_RE.search(question) else ANSWER
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def _shingles(words: List[str]) -> set:
+    return {" ".join(words[i:i + 3]) for i in range(max(1, len(words) - 2))}
+
+
+def rank_chunks(question: str, chunks: List[str]) -> List[Tuple[float, str]]:
+    """Score chunks by retrieval rank plus how many question terms they contain; best first."""
+    terms = {word for word in _words(question) if len(word) > 2}
+    scored = []
+    for rank, chunk in enumerate(chunks):
+        overlap = len(terms & set(_words(chunk))) / len(terms) if terms else 0.0
+        scored.append((1.0 / (rank + 1) + 0.5 * overlap, chunk))
+    return sorted(scored, key=lambda item: -item[0])
+
+
+def build_context(question: str, chunks: List[str], model: str) -> Tuple[str, Dict[str, int]]:
+    """Pack the best distinct chunks into the model's token budget.
+
+    Exact duplicates and chunks that mostly repeat a better one (such as the
+    overlap between neighbouring chunks) are dropped. Chunks are then added
+    best first while they fit; when the next one does not, its beginning is
+    used to fill what is left.
+    """
+    budget = CONTEXT_BUDGETS.get(model, DEFAULT_CONTEXT_BUDGET)
+    kept, seen_hashes, kept_shingles, duplicates = [], set(), [], 0
+    used = 0
+    for _, chunk in rank_chunks(question, chunks):
+        digest = hashlib.sha256(" ".join(_words(chunk)).encode("utf-8")).hexdigest()
+        shingles = _shingles(_words(chunk))
+        if digest in seen_hashes or any(
+            len(shingles & other) / len(shingles | other) >= DUPLICATE_SIMILARITY for other in kept_shingles
+        ):
+            duplicates += 1
+            continue
+        seen_hashes.add(digest)
+        kept_shingles.append(shingles)
+
+        tokens = count_tokens(chunk)
+        if used + tokens > budget:
+            remaining = budget - used
+            if remaining < 50:
+                break
+            # Cut the chunk down to what is left of the budget
+            chunk = chunk[:remaining * 4]
+            while count_tokens(chunk) > remaining:
+                chunk = chunk[:int(len(chunk) * 0.9)]
+            tokens = count_tokens(chunk)
+        kept.append(chunk)
+        used += tokens
+        if used >= budget:
+            break
+    return "\n\n".join(kept), {"context_tokens": used, "chunks_used": len(kept), "duplicates_dropped": duplicates}
+
+
+def build_prompt(question: str, chunks: List[str], model: str) -> Tuple[str, str, Dict[str, int]]:
+    """(intent, prompt, stats) for one /ask request."""
+    intent = classify_intent(question)
+    context, stats = build_context(question, chunks, model)
+    return intent, PROMPTS[intent].format(context=context, question=question), stats
+
+
+def legacy_llm_calls(question: str) -> int:
+    """LLM calls /ask used to make: a second one only when the question literally said "important questions"."""
+    return 2 if "important questions" in question.lower() else 1
+
+
+def legacy_prompt_tokens(question: str, chunks: List[str]) -> int:
+    """Prompt tokens /ask used to send for the same search: the first 10,000 words of the top
+    results concatenated, plus a second call with all of them for "important questions"."""
+    context = " ".join(chunks[:LEGACY_SEARCH_RESULTS])
+    truncated = " ".join(context.split()[:10000])
+    tokens = count_tokens(
+        f"Context: {truncated}\n\nQuestion: {question}\n\nAnswer the question based only on the context provided. "
+        "Format the response using Markdown for proper spacing, paragraphs, and bold headings."
+    )
+    if legacy_llm_calls(question) > 1:
+        tokens += count_tokens(f"Context: {context}\n\nGenerate 5 important questions based on the provided context.")
+    return tokens
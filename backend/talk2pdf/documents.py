@@ -0,0 +1,240 @@
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Make the shared backend helpers importable
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.cache import CACHE_DIR, SingleFlight
+
+# Embedded documents kept before the least recently used idle one is dropped
+MAX_DOCUMENTS = int(os.getenv("TALK2PDF_MAX_DOCUMENTS", 50))
+
+LOADING, READY = "loading", "ready"
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def collection_name(document_id: str) -> str:
+    """Vector collection (pgvector table) holding one document's chunks."""
+    return f"pdf_{document_id[:24]}"
+
+
+class DocumentNotFound(KeyError):
+    """The document was never uploaded, is still loading, or has been evicted."""
+
+
+class DocumentStore:
+    """Embedded PDFs keyed by the SHA-256 of their bytes.
+
+    Each document has its own vector collection, so uploading a PDF that is
+    already embedded is a cache hit and users never overwrite each other's
+    index. `open_knowledge_base(document_id, path)` builds the knowledge base
+    object for a document; it must expose `vector_db.drop()`, which drops
+    the collection when the document is evicted. `on_evict(document_id)`
+    removes anything else kept per document.
+
+    The registry is a SQLite table, so collections are found again after a
+    restart. Documents in use (see `use`) are never evicted; otherwise the
+    least recently used one goes once there are more than `capacity`.
+    """
+
+    def __init__(self, open_knowledge_base: Callable[[str, str], Any], capacity: int = MAX_DOCUMENTS,
+                 path: Optional[str] = None, on_evict: Optional[Callable[[str], None]] = None):
+        self.open_knowledge_base = open_knowledge_base
+        self.on_evict = on_evict
+        self.capacity = capacity
+        self.path = path or os.path.join(CACHE_DIR, "talk2pdf_documents.sqlite3")
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._knowledge_bases: Dict[str, Any] = {}
+        self._refs: Dict[str, int] = {}
+        self._progress: Dict[str, Tuple[int, int]] = {}  # document id -> (pages indexed, pages total) while loading
+        self._evicting: Dict[str, threading.Event] = {}  # document id -> set once its collection is dropped
+        self.counters = {"hits": 0, "loads": 0, "evictions": 0}
+        self._flight = SingleFlight()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                " id TEXT PRIMARY KEY, filename TEXT NOT NULL, path TEXT NOT NULL, status TEXT NOT NULL,"
+                " created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+
+    def get(self, document_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, filename, path, status, created_at, last_used FROM documents WHERE id = ?",
+                (document_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"id": row[0], "filename": row[1], "path": row[2], "status": row[3],
+                "created_at": row[4], "last_used": row[5]}
+
+    def is_ready(self, document_id: str) -> bool:
+        document = self.get(document_id)
+        return document is not None and document["status"] == READY
+
+    def lookup(self, document_id: str) -> bool:
+        """True, counted as a cache hit, if the document is already embedded."""
+        with self._lock:
+            if not self.is_ready(document_id):
+                return False
+            self.counters["hits"] += 1
+            self.touch(document_id)
+        return True
+
+    def touch(self, document_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE documents SET last_used = ? WHERE id = ?", (time.time(), document_id))
+
+    def _knowledge_base(self, document: Dict):
+        knowledge_base = self._knowledge_bases.get(document["id"])
+        if knowledge_base is None:
+            knowledge_base = self._knowledge_bases[document["id"]] = self.open_knowledge_base(document["id"], document["path"])
+        return knowledge_base
+
+    def load(self, document_id: str, path: str, filename: str, embed: Callable[[Any], None]) -> bool:
+        """Embed a document unless it is already ready; returns True on a cache hit.
+
+        `embed(knowledge_base)` does the actual loading. Concurrent loads of
+        the same document share one run, and the document is referenced
+        while it loads, so it cannot be evicted half way.
+        """
+        if self.lookup(document_id):
+            return True
+        _, shared = self._flight.do(document_id, lambda: self._load(document_id, path, filename, embed))
+        return shared
+
+    def _load(self, document_id: str, path: str, filename: str, embed: Callable[[Any], None]) -> None:
+        while True:
+            with self._lock:
+                evicting = self._evicting.get(document_id)
+                if evicting is None:
+                    now = time.time()
+                    with self._conn:
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO documents (id, filename, path, status, created_at, last_used)"
+                            " VALUES (?, ?, ?, ?, ?, ?)", (document_id, filename, path, LOADING, now, now),
+                        )
+                    self._knowledge_bases.pop(document_id, None)
+                    knowledge_base = self._knowledge_base(self.get(document_id))
+                    self._refs[document_id] = self._refs.get(document_id, 0) + 1
+                    break
+            # Re-uploaded while its old collection is being dropped: wait, or the drop would hit the new one
+            evicting.wait()
+
+        try:
+            embed(knowledge_base)
+            with self._lock, self._conn:
+                self._conn.execute("UPDATE documents SET status = ? WHERE id = ?", (READY, document_id))
+                self.counters["loads"] += 1
+        finally:
+            with self._lock:
+                self._progress.pop(document_id, None)
+            self._release(document_id)
+        self.evict()
+
+    def report_progress(self, document_id: str, pages_indexed: int, pages_total: int) -> None:
+        """Record how far a load got; once pages are indexed, `use` serves the document already."""
+        with self._lock:
+            self._progress[document_id] = (pages_indexed, pages_total)
+
+    def progress(self, document_id: str) -> Optional[Tuple[int, int]]:
+        """(pages indexed, pages total) while the document is loading, else None."""
+        with self._lock:
+            return self._progress.get(document_id)
+
+    @contextmanager
+    def use(self, document_id: str):
+        """Yield the knowledge base of a document, holding a reference so it is not evicted meanwhile.
+
+        A document that is still loading can be used once some of its pages
+        are indexed; searches then only cover those pages.
+        """
+        with self._lock:
+            document = self.get(document_id) if document_id else None
+            partial = document is not None and self._progress.get(document_id, (0, 0))[0] > 0
+            if document is None or (document["status"] != READY and not partial):
+                raise DocumentNotFound(document_id)
+            knowledge_base = self._knowledge_base(document)
+            self._refs[document_id] = self._refs.get(document_id, 0) + 1
+            self.touch(document_id)
+        try:
+            yield knowledge_base
+        finally:
+            self._release(document_id)
+
+    def _release(self, document_id: str) -> None:
+        with self._lock:
+            self._refs[document_id] -= 1
+            if not self._refs[document_id]:
+                del self._refs[document_id]
+
+    def evict(self) -> int:
+        """Drop idle documents, least recently used first, until at most `capacity` remain.
+
+        Victims leave the registry under the lock, so nothing can use them
+        any more; their collections are then dropped without holding it.
+        """
+        victims = []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, filename, path, status, created_at, last_used FROM documents ORDER BY last_used"
+            ).fetchall()
+            excess = len(rows) - self.capacity
+            for row in rows:
+                if excess <= 0:
+                    break
+                if row[0] in self._refs or row[0] in self._evicting:
+                    continue
+                victims.append((row, self._knowledge_base({"id": row[0], "path": row[2]})))
+                self._evicting[row[0]] = threading.Event()
+                with self._conn:
+                    self._conn.execute("DELETE FROM documents WHERE id = ?", (row[0],))
+                self._knowledge_bases.pop(row[0], None)
+                if os.path.exists(row[2]):
+                    os.remove(row[2])
+                excess -= 1
+
+        evicted = 0
+        for row, knowledge_base in victims:
+            document_id = row[0]
+            try:
+                knowledge_base.vector_db.drop()
+                if self.on_evict:
+                    self.on_evict(document_id)
+                evicted += 1
+            except Exception as e:
+                print(f"Error dropping collection of document {document_id}: {e}")
+                # Back in the registry, so a later eviction tries again
+                with self._lock, self._conn:
+                    self._conn.execute("INSERT OR IGNORE INTO documents (id, filename, path, status, created_at,"
+                                       " last_used) VALUES (?, ?, ?, ?, ?, ?)", row)
+            finally:
+                with self._lock:
+                    self._evicting.pop(document_id).set()
+        with self._lock:
+            self.counters["evictions"] += evicted
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["documents"] = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            stats["in_use"] = len(self._refs)
+        stats["capacity"] = self.capacity
+        return stats
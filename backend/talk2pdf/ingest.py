@@ -0,0 +1,150 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from hashlib import md5
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pypdf import PdfReader
+
+# Processes extracting page text, and chunks per embedding request / insert
+INGEST_WORKERS = int(os.getenv("TALK2PDF_INGEST_WORKERS", min(4, os.cpu_count() or 1)))
+EMBED_BATCH_SIZE = int(os.getenv("TALK2PDF_EMBED_BATCH_SIZE", 64))
+# Pages handed to a worker at a time; small enough for steady progress
+PAGES_PER_TASK = 8
+
+
+def page_count(path: str) -> int:
+    return len(PdfReader(path).pages)
+
+
+# Parsed PDF per process, so a worker opens the file once, not once per task
+_readers = {}
+
+
+def _extract_pages(path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    """Runs in a worker process: text of pages start..stop-1, numbered from 1."""
+    key = (path, os.path.getmtime(path))
+    reader = _readers.get(key)
+    if reader is None:
+        _readers.clear()
+        reader = _readers[key] = PdfReader(path)
+    return [(number + 1, reader.pages[number].extract_text() or "") for number in range(start, stop)]
+
+
+# Extraction pools by size. Workers are spawned, not forked: forking a process
+# that runs server and job threads can copy a held lock into the child.
+# Spawning is slow, so the pools are kept for later uploads.
+_pools: Dict[int, ProcessPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return pool
+
+
+def extract_pages(path: str, workers: int = INGEST_WORKERS, total: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    """Yield (page number, text) in page order while later pages are still being extracted."""
+    total = page_count(path) if total is None else total
+    ranges = [(start, min(start + PAGES_PER_TASK, total)) for start in range(0, total, PAGES_PER_TASK)]
+    if not ranges:
+        return
+    if workers <= 1:
+        for start, stop in ranges:
+            yield from _extract_pages(path, start, stop)
+        _readers.clear()
+        return
+    pool = _pool(workers)
+    starts, stops = zip(*ranges)
+    try:
+        for pages in pool.map(_extract_pages, [path] * len(ranges), starts, stops):
+            yield from pages
+    except BrokenProcessPool:
+        # A worker died; the next upload gets a fresh pool
+        with _pools_lock:
+            if _pools.get(workers) is pool:
+                del _pools[workers]
+        raise
+
+
+def chunk_pages(pages: Iterable[Tuple[int, str]], name: str, chunker: Optional[Callable] = None):
+    """Turn pages into phi Documents, the way PDFReader(chunk=True) does; yields (page number, chunks)."""
+    from phi.document import Document
+
+    for number, text in pages:
+        document = Document(name=name, id=f"{name}_{number}", meta_data={"page": number}, content=text)
+        yield number, chunker(document) if chunker else [document]
+
+
+def embed_texts(embedder, texts: List[str]) -> List[List[float]]:
+    """Embed many texts at once. OpenAI-compatible embedders get one request per batch."""
+    if hasattr(embedder, "response") and hasattr(embedder, "encoding_format"):
+        # OpenAIEmbedder.response passes its input straight to the embeddings API, which takes a list
+        data = embedder.response(text=texts).data
+        return [item.embedding for item in sorted(data, key=lambda item: item.index)]
+    return [embedder.get_embedding(text) for text in texts]
+
+
+def pgvector_writer(vector_db) -> Callable[[List], None]:
+    """Write embedded Documents to a PgVector2 table with one multi-row insert per call."""
+    from sqlalchemy.dialects import postgresql
+
+    def write(documents) -> None:
+        rows = []
+        for document in documents:
+            content = document.content.replace("\x00", "\ufffd")
+            content_hash = md5(content.encode()).hexdigest()
+            rows.append({
+                "id": document.id or content_hash, "name": document.name, "meta_data": document.meta_data,
+                "content": content, "embedding": document.embedding, "usage": document.usage,
+                "content_hash": content_hash,
+            })
+        if rows:
+            with vector_db.Session() as session, session.begin():
+                session.execute(postgresql.insert(vector_db.table), rows)
+
+    return write
+
+
+def vector_writer(vector_db) -> Callable[[List], None]:
+    """Bulk writer for the collection: the store's own when it has one, else a PgVector2 insert."""
+    if hasattr(vector_db, "insert_embedded"):
+        return vector_db.insert_embedded
+    return pgvector_writer(vector_db)
+
+
+def ingest_pdf(path: str, name: str, embed: Callable[[List[str]], List], write: Callable[[List], None],
+               chunker: Optional[Callable] = None, workers: int = INGEST_WORKERS,
+               batch_size: int = EMBED_BATCH_SIZE, progress: Optional[Callable[[int, int], None]] = None) -> int:
+    """Extract, chunk, embed and store a PDF as a stream; returns the number of chunks written.
+
+    Pages are extracted on a process pool while earlier pages are embedded.
+    Each batch is committed on its own, so the pages written so far can be
+    searched while the rest is loading. `progress(pages_done, pages_total)`
+    is called after every write.
+    """
+    total = page_count(path)
+    batch, written = [], 0
+
+    def flush(pages_done):
+        nonlocal batch, written
+        if batch:
+            for document, embedding in zip(batch, embed([document.content for document in batch])):
+                document.embedding = embedding
+            write(batch)
+            written += len(batch)
+            batch = []
+        if progress:
+            progress(pages_done, total)
+
+    for number, chunks in chunk_pages(extract_pages(path, workers, total), name, chunker):
+        batch.extend(chunk for chunk in chunks if chunk.content.strip())
+        if len(batch) >= batch_size:
+            flush(number)
+    flush(total)
+    return written
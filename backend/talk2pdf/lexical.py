@@ -0,0 +1,205 @@
+import json
+import math
+import os
+import re
+import shutil
+import sys
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import md5
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Make the shared backend helpers importable
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.cache import CACHE_DIR
+
+LEXICAL_DIR = os.getenv("TALK2PDF_LEXICAL_DIR", os.path.join(CACHE_DIR, "talk2pdf_lexical"))
+# Reciprocal rank fusion constant; 60 is the value from the original RRF paper
+RRF_K = 60
+
+# Section numbers (3.2.1) and formula names (H2O, x^2 -> x, 2) stay single terms where possible
+_TERM_RE = re.compile(r"\d+(?:\.\d+)+|\w+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were what which "
+    "who why how with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [term for term in _TERM_RE.findall(text.lower()) if term not in _STOPWORDS]
+
+
+class LexicalIndex:
+    """BM25 index over the chunks of one document, persisted next to its vectors.
+
+    Postings are kept as flat NumPy arrays: for term t, rows
+    `chunk_ids[offsets[t]:offsets[t + 1]]` with term frequencies `tfs[...]`.
+    Scoring a query is a few array slices and vector operations per term.
+    Chunks can be added while the document is loading; the arrays are
+    rebuilt on the next search.
+    """
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self.documents: List[Dict] = []
+        self._pending: Dict[str, List[Tuple[int, int]]] = {}
+        self._lengths: List[int] = []
+        self._terms: Dict[str, int] = {}
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._chunk_ids = np.zeros(0, dtype=np.int32)
+        self._tfs = np.zeros(0, dtype=np.float32)
+        self._doc_lengths = np.zeros(0, dtype=np.float32)
+        self._dirty = False
+        if os.path.exists(os.path.join(path, "postings.npz")):
+            self._read()
+
+    def add(self, documents) -> None:
+        """Index phi Documents (or anything with `content`, `name`, `meta_data`)."""
+        with self._lock:
+            for document in documents:
+                row = len(self.documents)
+                terms = tokenize(document.content)
+                for term, tf in Counter(terms).items():
+                    self._pending.setdefault(term, []).append((row, tf))
+                self._lengths.append(len(terms))
+                self.documents.append({"name": document.name, "meta_data": document.meta_data,
+                                       "content": document.content})
+            self._dirty = True
+
+    def _freeze(self) -> None:
+        """Merge pending postings into the flat arrays. Caller holds the lock."""
+        if not self._dirty:
+            return
+        vocabulary = sorted(set(self._terms) | set(self._pending))
+        term_ids = {term: index for index, term in enumerate(vocabulary)}
+
+        # Existing postings keep their rows; only their term ids move to the merged vocabulary
+        remap = np.array([term_ids[term] for term in self._terms], dtype=np.int64)
+        old_terms = np.repeat(remap, np.diff(self._offsets))
+        new_terms, new_rows, new_tfs = [], [], []
+        for term, entries in self._pending.items():
+            new_terms.extend([term_ids[term]] * len(entries))
+            new_rows.extend(row for row, _ in entries)
+            new_tfs.extend(tf for _, tf in entries)
+
+        all_terms = np.concatenate([old_terms, np.array(new_terms, dtype=np.int64)])
+        all_rows = np.concatenate([self._chunk_ids, np.array(new_rows, dtype=np.int32)])
+        all_tfs = np.concatenate([self._tfs, np.array(new_tfs, dtype=np.float32)])
+        order = np.lexsort((all_rows, all_terms))
+
+        self._terms = term_ids
+        self._offsets = np.concatenate([[0], np.cumsum(np.bincount(all_terms, minlength=len(vocabulary)))]).astype(np.int64)
+        self._chunk_ids = all_rows[order]
+        self._tfs = all_tfs[order]
+        self._doc_lengths = np.array(self._lengths, dtype=np.float32)
+        self._pending = {}
+        self._dirty = False
+
+    def search_rows(self, query: str, limit: int = 5) -> List[Tuple[int, float]]:
+        """(row, BM25 score) of the best matching chunks, best first."""
+        with self._lock:
+            self._freeze()
+            terms, offsets, chunk_ids, tfs, lengths = self._terms, self._offsets, self._chunk_ids, self._tfs, self._doc_lengths
+        count = len(lengths)
+        if not count:
+            return []
+        average = lengths.mean() or 1.0
+        norm = self.k1 * (1 - self.b + self.b * lengths / average)
+        scores = np.zeros(count, dtype=np.float32)
+        for term in set(tokenize(query)):
+            index = terms.get(term)
+            if index is None:
+                continue
+            rows = chunk_ids[offsets[index]:offsets[index + 1]]
+            tf = tfs[offsets[index]:offsets[index + 1]]
+            idf = math.log(1 + (count - len(rows) + 0.5) / (len(rows) + 0.5))
+            # A term lists each row once, so plain fancy-index addition is safe
+            scores[rows] += idf * tf * (self.k1 + 1) / (tf + norm[rows])
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return []
+        best = matched[np.argsort(-scores[matched])[:limit]]
+        return [(int(row), float(scores[row])) for row in best]
+
+    def search(self, query: str, limit: int = 5) -> List[Dict]:
+        """The best matching chunks as {"name", "meta_data", "content"} dicts."""
+        return [self.documents[row] for row, _ in self.search_rows(query, limit)]
+
+    def save(self) -> None:
+        with self._lock:
+            self._freeze()
+            os.makedirs(self.path, exist_ok=True)
+            np.savez(os.path.join(self.path, "postings.npz"), terms=np.array(list(self._terms), dtype=str),
+                     offsets=self._offsets, chunk_ids=self._chunk_ids, tfs=self._tfs, doc_lengths=self._doc_lengths)
+            with open(os.path.join(self.path, "documents.jsonl"), "w", encoding="utf-8") as f:
+                f.write("".join(json.dumps(document) + "\n" for document in self.documents))
+
+    def _read(self) -> None:
+        with np.load(os.path.join(self.path, "postings.npz")) as data:
+            self._terms = {str(term): index for index, term in enumerate(data["terms"])}
+            self._offsets, self._chunk_ids, self._tfs = data["offsets"], data["chunk_ids"], data["tfs"]
+            self._doc_lengths = data["doc_lengths"]
+        self._lengths = self._doc_lengths.astype(int).tolist()
+        with open(os.path.join(self.path, "documents.jsonl"), encoding="utf-8") as f:
+            self.documents = [json.loads(line) for line in f if line.strip()]
+
+
+class LexicalStore:
+    """Open lexical indexes by collection name, one folder each under `root`."""
+
+    def __init__(self, root: str = LEXICAL_DIR):
+        self.root = root
+        self._indexes: Dict[str, LexicalIndex] = {}
+        self._lock = threading.Lock()
+
+    def get(self, collection: str) -> LexicalIndex:
+        with self._lock:
+            index = self._indexes.get(collection)
+            if index is None:
+                index = self._indexes[collection] = LexicalIndex(os.path.join(self.root, collection))
+            return index
+
+    def create(self, collection: str) -> LexicalIndex:
+        """A new, empty index, replacing any previous one."""
+        self.drop(collection)
+        return self.get(collection)
+
+    def drop(self, collection: str) -> None:
+        with self._lock:
+            self._indexes.pop(collection, None)
+            shutil.rmtree(os.path.join(self.root, collection), ignore_errors=True)
+
+
+def content_key(content: str) -> str:
+    return md5(content.replace("\x00", "\ufffd").encode()).hexdigest()
+
+
+def reciprocal_rank_fusion(result_lists: List[List], key: Callable, limit: int, k: int = RRF_K) -> List:
+    """Merge ranked lists: each item scores sum(1 / (k + rank)) over the lists it appears in."""
+    scores: Dict[str, float] = {}
+    items = {}
+    for results in result_lists:
+        for rank, item in enumerate(results):
+            item_key = key(item)
+            scores[item_key] = scores.get(item_key, 0.0) + 1.0 / (k + rank + 1)
+            items.setdefault(item_key, item)
+    return [items[item_key] for item_key in sorted(scores, key=lambda item_key: -scores[item_key])[:limit]]
+
+
+_search_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hybrid-search")
+
+
+def hybrid_search(vector_search: Callable[[str, int], List], lexical_index: Optional[LexicalIndex], query: str,
+                  limit: int = 5, candidates: Optional[int] = None) -> List[str]:
+    """Chunk texts from vector and BM25 search, run in parallel and fused with RRF."""
+    candidates = candidates or limit * 2
+    vector_future = _search_pool.submit(vector_search, query, candidates)
+    lexical = [document["content"] for document in lexical_index.search(query, candidates)] if lexical_index else []
+    vector = [document.content for document in vector_future.result()]
+    return reciprocal_rank_fusion([vector, lexical], key=content_key, limit=limit)
@@ -1,81 +1,183 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, session
+import functools
 import os
+import secrets
+import sys
+import threading
+import uuid
+import numpy as np
 from werkzeug.utils import secure_filename
-from groq import Groq
 from phi.assistant import Assistant
 from phi.knowledge.pdf import PDFKnowledgeBase, PDFReader
 from phi.vectordb.pgvector import PgVector2
 from phi.storage.assistant.postgres import PgAssistantStorage
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine
+
+# Make the shared backend helpers importable
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.jobs import JOB_SYNC_WAIT, JobQueue, job_response, register_job_routes
+from common.llm import count_tokens, get_groq_client
+from common.resources import ResourceRegistry, register_health_routes
+from answers import AnswerCache
+from context import build_prompt, classify_intent, legacy_llm_calls, legacy_prompt_tokens
+from documents import DocumentNotFound, DocumentStore, collection_name, file_sha256
+from ingest import embed_texts, ingest_pdf, vector_writer
+from lexical import LexicalStore, hybrid_search
+from vector_store import NumpyVectorDb
 
 # Load environment variables from .env file
 load_dotenv()
 
 app = Flask(__name__)
+# Each browser session remembers the document it uploaded last
+app.secret_key = os.getenv("FLASK_SECRET_KEY")
+if not app.secret_key:
+    # A random key still signs sessions, but they end with the process and are not shared between workers
+    print("FLASK_SECRET_KEY is not set; using a random key for this process")
+    app.secret_key = secrets.token_hex(32)
 
 # Set up environment variables
 os.environ["GROQ_API_KEY"] = os.getenv("GROQ_API_KEY")  # Load Groq API key from .env
 db_url = "postgresql+psycopg://ai:ai@localhost:5532/ai"
+# "pgvector" needs the Postgres container; "numpy" keeps the vectors in-process, under .cache/
+VECTOR_STORE = os.getenv("TALK2PDF_VECTOR_STORE", "pgvector")
+
+# One pooled engine for every collection; connections are opened on first use
+engine = create_engine(
+    db_url,
+    pool_size=int(os.getenv("PG_POOL_SIZE", 5)),
+    max_overflow=int(os.getenv("PG_MAX_OVERFLOW", 10)),
+    pool_pre_ping=True,
+)
 
-# Initialize Groq client
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Shared, rate-limited Groq client
+groq_client = get_groq_client()
+ASK_MODEL = "gemma2-9b-it"
+# Chunks fetched per question; the context builder keeps what fits the model's budget
+SEARCH_CANDIDATES = int(os.getenv("TALK2PDF_SEARCH_CANDIDATES", 5))
+
+# Prompt size accounting for /ask, against the old truncate-and-concatenate prompts
+ask_stats = {"requests": 0, "prompt_tokens": 0, "prompt_tokens_saved": 0, "llm_calls_saved": 0}
+ask_stats_lock = threading.Lock()
 
 # Configure upload folder
 UPLOAD_FOLDER = "uploads"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 
-# Knowledge Base and Storage
-knowledge_base = None
-storage = PgAssistantStorage(table_name="pdf_assistant", db_url=db_url)
+# Postgres is only connected on first use, so the service still boots while it is down
+resources = ResourceRegistry()
+if VECTOR_STORE == "pgvector":
+    storage = resources.register("storage", lambda: PgAssistantStorage(table_name="pdf_assistant", db_engine=engine))
 
-def truncate_context(context: str, max_tokens: int = 10000) -> str:
-    """
-    Truncate the context to a maximum number of tokens to avoid exceeding rate limits.
-    """
-    tokens = context.split()  # Split context into tokens (words)
-    truncated_tokens = tokens[:max_tokens]  # Take the first `max_tokens` tokens
-    return " ".join(truncated_tokens)  # Join tokens back into a string
+class GroqError(Exception):
+    """The Groq call for an /ask failed or came back empty."""
 
-def ask_groq(question: str, context: str) -> str:
+def ask_groq(prompt: str) -> str:
     """
-    Function to query the Groq model for questions, restricted to the provided context (PDF content).
+    Function to query the Groq model with a prompt built from the PDF context.
+    Raises GroqError instead of returning an error message as the answer.
     """
     try:
-        # Truncate the context to avoid exceeding token limits
-        truncated_context = truncate_context(context, max_tokens=10000)
-        prompt = f"Context: {truncated_context}\n\nQuestion: {question}\n\nAnswer the question based only on the context provided. Format the response using Markdown for proper spacing, paragraphs, and bold headings."
         response = groq_client.chat.completions.create(
             messages=[{"role": "user", "content": prompt}],
-            model="gemma2-9b-it",  # Use the appropriate Groq model
+            model=ASK_MODEL,
         )
-        return response.choices[0].message.content
     except Exception as e:
-        return f"Error querying Groq: {str(e)}"
+        raise GroqError(f"Error querying Groq: {e}") from e
+    content = response.choices[0].message.content
+    if not content:
+        raise GroqError("Groq returned an empty answer")
+    return content
 
-def clear_vector_db(collection_name: str):
-    """
-    Clear all embeddings from the vector database for a specific collection.
-    """
+def embed_question(vector_db, question: str):
+    """Embedding of the question, shared by the answer cache and the vector search"""
     try:
-        # Create a SQLAlchemy engine
-        engine = create_engine(db_url)
-        
-        # Execute a raw SQL query to delete all rows from the table
-        with engine.connect() as connection:
-            query = text("DELETE FROM items")  # Remove the condition
-            connection.execute(query)
-            connection.commit()
-        print(f"Cleared all embeddings from items table")
+        return vector_db.embedder.get_embedding(question) or None
     except Exception as e:
-        print(f"Error clearing vector database: {str(e)}")
-        raise
+        print(f"Error embedding question: {e}")
+        return None
+
+def record_ask(prompt_tokens: int, saved_tokens: int, calls_saved: int) -> None:
+    with ask_stats_lock:
+        ask_stats["requests"] += 1
+        ask_stats["prompt_tokens"] += prompt_tokens
+        ask_stats["prompt_tokens_saved"] += saved_tokens
+        ask_stats["llm_calls_saved"] += calls_saved
+
+def open_knowledge_base(document_id: str, file_path: str):
+    """Knowledge base over the document's own collection"""
+    if VECTOR_STORE == "numpy":
+        vector_db = NumpyVectorDb(collection=collection_name(document_id))
+    else:
+        vector_db = PgVector2(collection=collection_name(document_id), db_engine=engine)
+    return PDFKnowledgeBase(path=file_path, vector_db=vector_db, reader=PDFReader(chunk=True))
+
+# BM25 indexes, one per document, built during ingestion and searched next to the vectors
+lexical_indexes = LexicalStore()
+
+# Answers to past questions per document, reused for the same or a near-identical question
+answer_cache = AnswerCache()
+
+def forget_document(document_id: str) -> None:
+    """Drop what is kept next to a document's collection once the collection is gone"""
+    lexical_indexes.drop(collection_name(document_id))
+    answer_cache.invalidate(document_id)
+
+# Embedded PDFs, keyed by the SHA-256 of the file
+documents = DocumentStore(open_knowledge_base, on_evict=forget_document)
+
+def load_pdf_job(payload, job):
+    """Job handler: embed one PDF into its own collection, unless that was done before"""
+    document_id = payload["document_id"]
+
+    def progress(pages_done, pages_total):
+        documents.report_progress(document_id, pages_done, pages_total)
+        job.progress(pages_done / max(pages_total, 1), f"Indexed {pages_done} of {pages_total} pages")
+
+    def embed(knowledge_base):
+        vector_db = knowledge_base.vector_db
+        # Start from a fresh collection, in case an earlier load was interrupted; a new document has none yet
+        if vector_db.exists():
+            vector_db.drop()
+        vector_db.create()
+        answer_cache.invalidate(document_id)
+        lexical_index = lexical_indexes.create(collection_name(document_id))
+        write_vectors = vector_writer(vector_db)
+
+        def write(chunks):
+            write_vectors(chunks)
+            lexical_index.add(chunks)
+
+        name = os.path.splitext(payload["filename"])[0].replace(" ", "_")
+        ingest_pdf(
+            payload["file_path"], name,
+            embed=lambda texts: embed_texts(vector_db.embedder, texts),
+            write=write,
+            chunker=knowledge_base.reader.chunk_document,
+            progress=progress,
+        )
+        lexical_index.save()
+
+    job.progress(0.0, "Extracting pages")
+    cached = documents.load(document_id, payload["file_path"], payload["filename"], embed)
+    return {"document_id": document_id, "filename": payload["filename"], "cached": cached}
+
+# PDF loading runs on background workers instead of the request thread
+jobs = JobQueue("talk2pdf")
+jobs.register("load_pdf", load_pdf_job)
+register_job_routes(app, jobs)
+register_health_routes(app, resources)
 
 @app.route("/")
 def index():
     return render_template("talktopdf.html")
 
+@app.route("/documents/stats")
+def document_stats():
+    return jsonify(documents.stats())
+
 @app.route("/upload", methods=["POST"])
 def upload_pdf():
     if "file" not in request.files:
@@ -85,25 +187,30 @@ def upload_pdf():
     if file.filename == "":
         return jsonify({"error": "No file selected"}), 400
 
-    # Save the uploaded file
+    # Save the uploaded file under the hash of its contents
     filename = secure_filename(file.filename)
-    file_path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-    file.save(file_path)
+    upload_path = os.path.join(app.config["UPLOAD_FOLDER"], f"upload_{uuid.uuid4().hex}.pdf")
+    file.save(upload_path)
+    document_id = file_sha256(upload_path)
+    file_path = os.path.join(app.config["UPLOAD_FOLDER"], f"{document_id}.pdf")
+    os.replace(upload_path, file_path)
+    session["document_id"] = document_id
 
-    # Clear the existing vector database before loading a new PDF
-    collection_name = "items"
-    clear_vector_db(collection_name)
+    # The same PDF was embedded before: nothing to do
+    if documents.lookup(document_id):
+        return jsonify({"message": "File uploaded successfully", "filename": filename,
+                        "document_id": document_id, "cached": True})
 
-    # Load the PDF into the knowledge base
-    global knowledge_base
-    knowledge_base = PDFKnowledgeBase(
-        path=file_path,
-        vector_db=PgVector2(collection=collection_name, db_url=db_url),
-        reader=PDFReader(chunk=True),
-    )
-    knowledge_base.load()
+    # Index the PDF on the job queue; ?async=1 returns the job id right away
+    job_id = jobs.submit("load_pdf", {"document_id": document_id, "file_path": file_path, "filename": filename})
+    wait_seconds = 0 if request.args.get("async") else JOB_SYNC_WAIT
+    job, pending, status = job_response(jobs, job_id, wait_seconds)
+    if pending:
+        return jsonify({**pending, "filename": filename, "document_id": document_id}), status
+    if job["status"] != "done":
+        return jsonify({"error": job["error"] or f"PDF loading {job['status']}"}), 500
 
-    return jsonify({"message": "File uploaded successfully", "filename": filename})
+    return jsonify({"message": "File uploaded successfully", **job["result"]})
 
 @app.route("/ask", methods=["POST"])
 def ask_question():
@@ -115,30 +222,74 @@ def ask_question():
     if not question:
         return jsonify({"error": "No question provided"}), 400
 
-    if not knowledge_base:
-        return jsonify({"error": "No PDF uploaded"}), 400
+    # Each session asks about its own document; clients may also name it explicitly
+    document_id = data.get("document_id") or session.get("document_id")
+    intent = classify_intent(question)
+    try:
+        with documents.use(document_id) as knowledge_base:
+            vector_db = knowledge_base.vector_db
+            # Embedded at most once, and only when needed: an exact cache hit skips the embedder call
+            question_embedding = functools.lru_cache(maxsize=None)(lambda: embed_question(vector_db, question))
 
-    # Search the PDF knowledge base for relevant context
-    context_results = knowledge_base.search(question)
-    if not context_results:
+            # Asked before on this document: answer without retrieval or an LLM call
+            cached = answer_cache.lookup(document_id, question, intent, question_embedding)
+            if cached:
+                return jsonify({**cached["result"], "cache": {"match": cached["match"],
+                                                               "similarity": cached["similarity"]}})
+
+            def vector_search(query, limit):
+                # The embedded store can reuse the question embedding instead of embedding it again
+                if hasattr(vector_db, "search_vector") and question_embedding() is not None:
+                    return vector_db.search_vector(np.asarray(question_embedding(), dtype=np.float32), limit)
+                return knowledge_base.search(query, num_documents=limit)
+
+            # Vector and BM25 search in parallel, fused, so exact terms like section numbers are found too
+            chunks = hybrid_search(
+                vector_search,
+                lexical_indexes.get(collection_name(document_id)),
+                question,
+                limit=SEARCH_CANDIDATES,
+            )
+    except DocumentNotFound:
+        return jsonify({"error": "No PDF uploaded"}), 400
+    # Questions asked while the PDF is still loading only see the pages indexed so far
+    loading = documents.progress(document_id)
+    if not chunks:
         return jsonify({"error": "No relevant information found in the PDF"}), 404
 
-    # Extract the `content` attribute from each Document object
-    context = " ".join([doc.content for doc in context_results])
+    # One prompt, for whichever intent the question has, packed into the model's token budget
+    intent, prompt, stats = build_prompt(question, chunks, ASK_MODEL)
+    try:
+        groq_response = ask_groq(prompt)
+    except GroqError as e:
+        # Nothing is recorded or cached for a failed call
+        print(e)
+        return jsonify({"error": str(e)}), 502
 
-    # Use Groq to answer the question based on the PDF context
-    groq_response = ask_groq(question, context)
+    prompt_tokens = count_tokens(prompt)
+    # Negative when the budget let in more context than the old top-2 search did
+    saved_tokens = legacy_prompt_tokens(question, chunks) - prompt_tokens
+    # Only questions the old code sent twice saved a call; the intent classifier matches more phrasings
+    record_ask(prompt_tokens, saved_tokens, legacy_llm_calls(question) - 1)
 
-    # If the user asks for important questions, generate them using Groq
-    if "important questions" in question.lower():
-        prompt = f"Context: {context}\n\nGenerate 5 important questions based on the provided context."
-        important_questions = groq_client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="gemma2-9b-it",
-        )
-        groq_response = important_questions.choices[0].message.content
+    result = {"response": groq_response, "intent": intent, "prompt_tokens": prompt_tokens,
+              "prompt_tokens_saved": saved_tokens, **stats}
+    if loading:
+        result.update(pages_indexed=loading[0], pages_total=loading[1])
+    else:
+        # Only answers from the complete document are worth keeping
+        answer_cache.store(document_id, question, question_embedding(), intent, result)
+    return jsonify(result)
+
+@app.route("/ask/stats")
+def ask_stats_route():
+    with ask_stats_lock:
+        return jsonify(dict(ask_stats))
 
-    return jsonify({"response": groq_response})
+@app.route("/answer-cache/stats")
+def answer_cache_stats():
+    return jsonify(answer_cache.stats())
 
 if __name__ == "__main__":
+    resources.start_warm_up(debug=True)
     app.run(host='0.0.0.0', port=3006,debug=True)
\ No newline at end of file
@@ -0,0 +1,261 @@
+import json
+import os
+import shutil
+import sys
+import threading
+from hashlib import md5
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from phi.document import Document
+from phi.embedder.base import Embedder
+from phi.vectordb.base import VectorDb
+
+# Make the shared backend helpers importable
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.cache import CACHE_DIR
+
+VECTOR_DIR = os.getenv("TALK2PDF_VECTOR_DIR", os.path.join(CACHE_DIR, "talk2pdf_vectors"))
+# "flat" scans every row; "ivf" probes the nearest clusters once a collection is large enough
+VECTOR_INDEX = os.getenv("TALK2PDF_VECTOR_INDEX", "flat")
+IVF_MIN_ROWS = int(os.getenv("TALK2PDF_IVF_MIN_ROWS", 20000))
+# 32 keeps recall@10 near 1.0 on overlapping clusters (see bench_vector_store.py)
+IVF_NPROBE = int(os.getenv("TALK2PDF_IVF_NPROBE", 32))
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first, without sorting everything."""
+    if k >= len(scores):
+        return np.argsort(-scores)
+    best = np.argpartition(-scores, k)[:k]
+    return best[np.argsort(-scores[best])]
+
+
+class IvfIndex:
+    """Inverted-file index: rows grouped by their nearest k-means centroid.
+
+    A search only scores the rows of the `nprobe` clusters closest to the
+    query, trading a little recall for a much smaller scan.
+    """
+
+    def __init__(self, matrix: np.ndarray, nlist: Optional[int] = None, iterations: int = 10,
+                 sample: int = 20000, seed: int = 0):
+        rows = len(matrix)
+        self.rows = rows
+        self.nlist = nlist or max(1, int(4 * np.sqrt(rows)))
+        rng = np.random.default_rng(seed)
+        training = np.asarray(matrix[rng.choice(rows, min(rows, max(sample, self.nlist)), replace=False)])
+        centroids = training[rng.choice(len(training), self.nlist, replace=False)]
+        for _ in range(iterations):
+            assignment = self._assign(training, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, training)
+            # Empty clusters keep their old centroid
+            filled = np.bincount(assignment, minlength=self.nlist) > 0
+            centroids[filled] = _normalize(sums[filled])
+        self.centroids = centroids
+
+        assignment = self._assign(matrix, centroids)
+        self.order = np.argsort(assignment, kind="stable")
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=self.nlist))])
+
+    @staticmethod
+    def _assign(matrix, centroids, block: int = 8192) -> np.ndarray:
+        return np.concatenate([
+            np.argmax(np.asarray(matrix[start:start + block]) @ centroids.T, axis=1)
+            for start in range(0, len(matrix), block)
+        ]) if len(matrix) else np.zeros(0, dtype=np.int64)
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        """Row numbers in the `nprobe` clusters nearest to the query."""
+        lists = top_k(self.centroids @ query, min(nprobe, self.nlist))
+        return np.concatenate([self.order[self.offsets[i]:self.offsets[i + 1]] for i in lists])
+
+
+class NumpyVectorDb(VectorDb):
+    """In-process vector store, a drop-in for PgVector2 in a PDFKnowledgeBase.
+
+    Each collection is a folder holding a float32 matrix of unit-length
+    embeddings (`vectors.f32`, memory-mapped for search) and a JSON-lines
+    sidecar with the documents (`documents.jsonl`), both append-only. Search
+    is a cosine top-k over the matrix, or over the probed clusters of an
+    IVF index when `index="ivf"` and the collection is large. Rows added
+    after the IVF index was built are always scanned, so nothing is missed
+    while it is stale.
+    """
+
+    def __init__(self, collection: str, path: Optional[str] = None, embedder: Optional[Embedder] = None,
+                 index: str = VECTOR_INDEX, nprobe: int = IVF_NPROBE, ivf_min_rows: int = IVF_MIN_ROWS):
+        if embedder is None:
+            from phi.embedder.openai import OpenAIEmbedder
+            embedder = OpenAIEmbedder()
+        self.collection = collection
+        self.path = os.path.join(path or VECTOR_DIR, collection)
+        self.embedder = embedder
+        self.dimensions = embedder.dimensions
+        self.index = index
+        self.nprobe = nprobe
+        self.ivf_min_rows = ivf_min_rows
+        self._lock = threading.RLock()
+        self._matrix: Optional[np.ndarray] = None
+        self._documents: List[Dict[str, Any]] = []
+        self._hashes, self._ids, self._names = set(), set(), set()
+        self._ivf: Optional[IvfIndex] = None
+        self._loaded = False
+
+    @property
+    def vectors_path(self) -> str:
+        return os.path.join(self.path, "vectors.f32")
+
+    @property
+    def documents_path(self) -> str:
+        return os.path.join(self.path, "documents.jsonl")
+
+    def _load(self) -> None:
+        """Map the matrix and read the sidecar, once per process (and after delete/drop)."""
+        if self._loaded:
+            return
+        documents = []
+        if os.path.exists(self.documents_path):
+            with open(self.documents_path, encoding="utf-8") as f:
+                documents = [json.loads(line) for line in f if line.strip()]
+        rows = os.path.getsize(self.vectors_path) // (4 * self.dimensions) if os.path.exists(self.vectors_path) else 0
+        # A write interrupted half way leaves one file longer than the other; trust the shorter one
+        rows = min(rows, len(documents))
+        self._documents = documents[:rows]
+        self._matrix = (np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dimensions))
+                        if rows else np.zeros((0, self.dimensions), dtype=np.float32))
+        self._hashes = {document["content_hash"] for document in self._documents}
+        self._ids = {document["id"] for document in self._documents}
+        self._names = {document["name"] for document in self._documents}
+        self._loaded = True
+
+    def create(self) -> None:
+        os.makedirs(self.path, exist_ok=True)
+
+    def exists(self) -> bool:
+        return os.path.isdir(self.path)
+
+    def doc_exists(self, document: Document) -> bool:
+        with self._lock:
+            self._load()
+            return md5(document.content.replace("\x00", "\ufffd").encode()).hexdigest() in self._hashes
+
+    def name_exists(self, name: str) -> bool:
+        with self._lock:
+            self._load()
+            return name in self._names
+
+    def id_exists(self, id: str) -> bool:
+        with self._lock:
+            self._load()
+            return id in self._ids
+
+    def insert(self, documents: List[Document], filters: Optional[Dict[str, Any]] = None) -> None:
+        for document in documents:
+            if document.embedding is None:
+                document.embed(embedder=self.embedder)
+        self.insert_embedded(documents)
+
+    def insert_embedded(self, documents: List[Document]) -> None:
+        """Append documents that already carry embeddings; one write per file."""
+        if not documents:
+            return
+        vectors = _normalize(np.asarray([document.embedding for document in documents], dtype=np.float32))
+        records = []
+        for document in documents:
+            content = document.content.replace("\x00", "\ufffd")
+            content_hash = md5(content.encode()).hexdigest()
+            records.append({"id": document.id or content_hash, "name": document.name, "meta_data": document.meta_data,
+                            "content": content, "usage": document.usage, "content_hash": content_hash})
+        with self._lock:
+            self.create()
+            self._load()
+            with open(self.vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self.documents_path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(record) + "\n" for record in records))
+            # Extend the in-memory view instead of re-reading the sidecar
+            self._documents.extend(records)
+            self._hashes.update(record["content_hash"] for record in records)
+            self._ids.update(record["id"] for record in records)
+            self._names.update(record["name"] for record in records)
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r",
+                                     shape=(len(self._documents), self.dimensions))
+
+    def upsert(self, documents: List[Document], filters: Optional[Dict[str, Any]] = None) -> None:
+        # Rows are append-only; documents already stored are left as they are
+        self.insert([document for document in documents if not self.doc_exists(document)], filters)
+
+    def search(self, query: str, limit: int = 5, filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        embedding = self.embedder.get_embedding(query)
+        if not embedding:
+            return []
+        return self.search_vector(np.asarray(embedding, dtype=np.float32), limit)
+
+    def vector_search(self, query: str, limit: int = 5) -> List[Document]:
+        return self.search(query, limit)
+
+    def _search(self, query: np.ndarray, limit: int):
+        """(row numbers best first, documents) for the `limit` rows nearest to a query embedding."""
+        with self._lock:
+            self._load()
+            matrix, documents = self._matrix, self._documents
+            ivf = self._index_for(matrix)
+        query = _normalize(query.astype(np.float32))
+        if ivf is None:
+            return top_k(matrix @ query, limit), documents
+        # Probed clusters plus every row added since the index was built
+        rows = np.concatenate([ivf.candidates(query, self.nprobe), np.arange(ivf.rows, len(matrix))])
+        return rows[top_k(np.asarray(matrix[rows]) @ query, limit)], documents
+
+    def search_rows(self, query: np.ndarray, limit: int = 5) -> np.ndarray:
+        return self._search(query, limit)[0]
+
+    def search_vector(self, query: np.ndarray, limit: int = 5) -> List[Document]:
+        rows, documents = self._search(query, limit)
+        return [
+            Document(name=documents[row]["name"], id=documents[row]["id"], meta_data=documents[row]["meta_data"],
+                     content=documents[row]["content"], embedder=self.embedder, usage=documents[row]["usage"])
+            for row in rows
+        ]
+
+    def _index_for(self, matrix: np.ndarray) -> Optional[IvfIndex]:
+        """The IVF index, (re)built once the collection has grown by a quarter since the last build."""
+        if self.index != "ivf" or len(matrix) < self.ivf_min_rows:
+            return None
+        if self._ivf is None or len(matrix) > self._ivf.rows * 1.25:
+            self._ivf = IvfIndex(matrix)
+        return self._ivf
+
+    def get_count(self) -> int:
+        with self._lock:
+            self._load()
+            return len(self._documents)
+
+    def delete(self) -> bool:
+        """Remove every row but keep the collection."""
+        with self._lock:
+            for path in (self.vectors_path, self.documents_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._ivf = None
+            self._loaded = False
+        return True
+
+    def drop(self) -> None:
+        with self._lock:
+            shutil.rmtree(self.path, ignore_errors=True)
+            self._ivf = None
+            self._loaded = False
+
+    def optimize(self) -> None:
+        with self._lock:
+            self._load()
+            if self.index == "ivf" and len(self._matrix) >= self.ivf_min_rows:
+                self._ivf = IvfIndex(self._matrix)